@@ -0,0 +1,658 @@
+"""
+Ad blocking primitives used by the request interceptor.
+Supports plain host lists as well as the Adblock Plus / EasyList network filter syntax.
+"""
+import bisect
+import hashlib
+import marshal
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+
+# Resource types understood by filter options, named as in the Adblock Plus syntax.
+RESOURCE_TYPES = frozenset(["document", "subdocument", "stylesheet", "script", "image", "font",
+                            "object", "media", "xmlhttprequest", "ping", "websocket", "other"])
+# Rules without a type option apply to everything except top-level documents.
+DEFAULT_RESOURCE_TYPES = RESOURCE_TYPES - {"document"}
+TYPE_ALIASES = {"xhr": "xmlhttprequest", "css": "stylesheet", "frame": "subdocument",
+                "doc": "document", "object-subrequest": "object"}
+# Options that do not change how a network request is matched.
+IGNORED_OPTIONS = frozenset(["important", "collapse", "~collapse"])
+# Tokens so common in URLs that indexing rules under them would not narrow anything down.
+COMMON_TOKENS = frozenset(["http", "https", "www", "com", "net", "org", "js", "html", "php"])
+
+_TOKEN_RE = re.compile(r"[a-z0-9%]{2,}")
+_HOST_RULE_RE = re.compile(r"^[a-z0-9.\-]+$")
+_SEPARATOR_REGEX = r"(?:[^\w\-.%]|$)"
+_HOST_ANCHOR_REGEX = r"^[a-z][a-z0-9+.\-]*://(?:[^/?#]*\.)?"
+
+# Compiled filter snapshots. Bump SNAPSHOT_VERSION whenever parsing or the file layout changes.
+SNAPSHOT_MAGIC = b"DBAB"
+SNAPSHOT_VERSION = 1
+# magic, version, source checksum, host count, rules offset, rules length
+_SNAPSHOT_HEADER = struct.Struct("<4sI32sQQQ")
+_RESOURCE_TYPE_ORDER = tuple(sorted(RESOURCE_TYPES))
+_BLOCKS_DOCUMENTS_FLAG = 0x8000
+
+
+def normalize_host(entry):
+    """
+    Turns an ad domain list entry into a bare lowercase host.
+    Accepts plain hosts as well as entries written as URLs or with wildcard prefixes.
+    Returns an empty string for blank lines and comments.
+    """
+    entry = entry.strip().lower()
+    if not entry or entry.startswith(("#", "!")):
+        return ""
+    if "://" in entry:
+        entry = entry.split("://", 1)[1]
+    entry = entry.split("/", 1)[0].split(":", 1)[0]
+    return entry.lstrip("*.").rstrip(".")
+
+
+def host_suffixes(host):
+    """Yields host and each of its parent domains, most specific first."""
+    while host:
+        yield host
+        dot = host.find(".")
+        if dot == -1:
+            return
+        host = host[dot + 1:]
+
+
+class DomainMatcher:
+    """
+    Hashed suffix set of hosts.
+    A host matches if it, or any parent domain of it, is in the set, so a lookup
+    costs one hash probe per host label regardless of how many domains are loaded.
+    Each domain can carry a value (e.g. the rule that added it), returned on a match.
+    """
+    def __init__(self, domains=()):
+        self.domains = {}
+        for entry in domains:
+            host = normalize_host(entry)
+            if host:
+                self.domains[host] = host
+
+    def __len__(self):
+        return len(self.domains)
+
+    def add(self, host, value=None):
+        self.domains.setdefault(host, host if value is None else value)
+
+    def match(self, host):
+        """Returns the value stored for the most specific domain covering host, or None."""
+        if not self.domains or not host:
+            return None
+        domains = self.domains
+        for suffix in host_suffixes(host.lower().rstrip(".")):
+            value = domains.get(suffix)
+            if value is not None:
+                return value
+        return None
+
+
+def _domain_listed(host, domains):
+    """Returns True if host or one of its parent domains is in the given set."""
+    return any(suffix in domains for suffix in host_suffixes(host))
+
+
+class FilterRule:
+    """A single compiled network filter."""
+    __slots__ = ("text", "source", "is_exception", "host", "pattern", "token", "match_case", "_regex",
+                 "types", "third_party", "include_domains", "exclude_domains")
+
+    def __init__(self, text, source=""):
+        self.text = text
+        self.source = source
+        self.is_exception = False
+        self.host = None # Set for "||host^" rules, which are matched through the host index
+        self.pattern = None # Regular expression source for all other rules
+        self.token = None # Index token that any URL matched by the pattern must contain
+        self.match_case = False
+        self._regex = None
+        self.types = DEFAULT_RESOURCE_TYPES
+        self.third_party = None # None matches both first- and third-party requests
+        self.include_domains = None
+        self.exclude_domains = None
+
+    def __repr__(self):
+        return f"FilterRule({self.text!r})"
+
+    def matches(self, url, lowered_url, resource_type, first_party_host, third_party):
+        """Checks options and, for pattern rules, the URL itself."""
+        if resource_type not in self.types:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.include_domains is not None and not _domain_listed(first_party_host, self.include_domains):
+            return False
+        if self.exclude_domains is not None and _domain_listed(first_party_host, self.exclude_domains):
+            return False
+        if self.pattern is None:
+            return True
+        if self._regex is None:
+            # Compiled on first use: most rules in large lists never see a candidate request.
+            self._regex = re.compile(self.pattern, 0 if self.match_case else re.IGNORECASE)
+        return self._regex.search(url if self.match_case else lowered_url) is not None
+
+
+def _pattern_to_regex(pattern, anchor_host, anchor_start, anchor_end):
+    """Translates an Adblock Plus URL pattern into a regular expression."""
+    parts = []
+    for char in pattern:
+        if char == "*":
+            parts.append(".*")
+        elif char == "^":
+            parts.append(_SEPARATOR_REGEX)
+        else:
+            parts.append(re.escape(char))
+    regex = "".join(parts)
+    if anchor_host:
+        regex = _HOST_ANCHOR_REGEX + regex
+    elif anchor_start:
+        regex = "^" + regex
+    if anchor_end:
+        regex += "$"
+    return regex
+
+
+def _pattern_token(pattern, anchored_start, anchored_end):
+    """
+    Picks the best index token for a pattern: the longest alphanumeric run that is
+    bounded by separators on both sides, so it must appear as a whole token in any matching URL.
+    Returns None if the pattern has no usable token.
+    """
+    best = None
+    for match in _TOKEN_RE.finditer(pattern):
+        start, end = match.span()
+        if start == 0 and not anchored_start:
+            continue
+        if start > 0 and pattern[start - 1] == "*":
+            continue
+        if end == len(pattern) and not anchored_end:
+            continue
+        if end < len(pattern) and pattern[end] == "*":
+            continue
+        token = match.group()
+        if token in COMMON_TOKENS:
+            continue
+        if best is None or len(token) > len(best):
+            best = token
+    return best
+
+
+def parse_filter(line, source=""):
+    """
+    Parses one line of an Adblock Plus filter list.
+    Returns a FilterRule, or None for comments, cosmetic filters and unsupported rules.
+    """
+    text = line.strip()
+    if not text or text.startswith(("!", "[")):
+        return None
+    if "##" in text or "#@#" in text or "#?#" in text or "#$#" in text:
+        return None
+
+    rule = FilterRule(text, source)
+    if text.startswith("@@"):
+        rule.is_exception = True
+        text = text[2:]
+
+    pattern = text
+    dollar = text.rfind("$")
+    if len(text) > 1 and text.startswith("/"):
+        # A regex may itself contain "$"; its options (if any) start after the closing slash
+        if text.endswith("/"):
+            dollar = -1
+        elif text.rfind("/$") > 0:
+            dollar = text.rfind("/$") + 1
+    if dollar != -1:
+        pattern = text[:dollar]
+        included_types = set()
+        excluded_types = set()
+        for option in text[dollar + 1:].split(","):
+            option = option.strip().lower()
+            negated = option.startswith("~")
+            name = option[1:] if negated else option
+            name = TYPE_ALIASES.get(name, name)
+            if name in RESOURCE_TYPES:
+                (excluded_types if negated else included_types).add(name)
+            elif name in ("third-party", "3p"):
+                rule.third_party = not negated
+            elif name in ("first-party", "1p"):
+                rule.third_party = negated
+            elif name == "match-case":
+                rule.match_case = True
+            elif name.startswith("domain="):
+                included, excluded = set(), set()
+                for domain in name[len("domain="):].split("|"):
+                    if domain.startswith("~"):
+                        excluded.add(domain[1:])
+                    elif domain:
+                        included.add(domain)
+                rule.include_domains = frozenset(included) or None
+                rule.exclude_domains = frozenset(excluded) or None
+            elif option in IGNORED_OPTIONS:
+                continue
+            else:
+                # Unknown options (redirect=, csp=, popup, ...) change the meaning of the rule,
+                # so skipping it is safer than applying it as a plain block.
+                return None
+        if included_types:
+            rule.types = frozenset(included_types - excluded_types)
+        elif excluded_types:
+            rule.types = frozenset(RESOURCE_TYPES - excluded_types)
+
+    is_regex = len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/")
+    if is_regex:
+        rule.pattern = pattern[1:-1]
+        return rule
+
+    anchor_host = pattern.startswith("||")
+    anchor_start = not anchor_host and pattern.startswith("|")
+    if anchor_host:
+        pattern = pattern[2:]
+    elif anchor_start:
+        pattern = pattern[1:]
+    anchor_end = pattern.endswith("|")
+    if anchor_end:
+        pattern = pattern[:-1]
+    if not rule.match_case:
+        pattern = pattern.lower()
+
+    if anchor_host and not anchor_end and pattern.endswith("^") and _HOST_RULE_RE.match(pattern[:-1]):
+        rule.host = pattern[:-1]
+        return rule
+    if not pattern.strip("*"):
+        # A rule that matches every URL is almost always a list error.
+        return None
+    rule.pattern = _pattern_to_regex(pattern, anchor_host, anchor_start, anchor_end)
+    rule.token = _pattern_token(pattern.lower(), anchor_host or anchor_start, anchor_end)
+    return rule
+
+
+class FilterEngine:
+    """
+    Indexed set of network filters.
+    Rules are bucketed so a request only evaluates a handful of candidates:
+    - plain "||host^" blocks live in a DomainMatcher (one probe per host label),
+    - other host-anchored rules are keyed by host,
+    - pattern rules are keyed by one token that must appear in any URL they match,
+    - the few rules without a usable token are checked for every request.
+    """
+    def __init__(self):
+        self.block_hosts = DomainMatcher()
+        self.host_rules = {}
+        self.token_rules = {}
+        self.generic_rules = []
+        self.document_exceptions = DomainMatcher()
+        self.rule_count = 0
+
+    def __len__(self):
+        return self.rule_count
+
+    def add_rule(self, rule):
+        self.rule_count += 1
+        if rule.host is not None:
+            if rule.is_exception and rule.types == frozenset(["document"]):
+                # "@@||site^$document" allowlists everything loaded by that site.
+                self.document_exceptions.add(rule.host, rule)
+            elif (not rule.is_exception and rule.types in (DEFAULT_RESOURCE_TYPES, RESOURCE_TYPES)
+                    and rule.third_party is None and rule.include_domains is None and rule.exclude_domains is None):
+                self.block_hosts.add(rule.host, rule)
+            else:
+                self.host_rules.setdefault(rule.host, []).append(rule)
+            return
+        if rule.token:
+            self.token_rules.setdefault(rule.token, []).append(rule)
+        else:
+            self.generic_rules.append(rule)
+
+    def add_domain(self, entry, source=""):
+        """Adds a plain host list entry, blocking the host for every resource type."""
+        host = normalize_host(entry)
+        if host:
+            rule = FilterRule(host, source)
+            rule.host = host
+            rule.types = RESOURCE_TYPES
+            self.add_rule(rule)
+
+    def add_filter_text(self, lines, source=""):
+        """Parses and adds every rule in an iterable of filter list lines."""
+        for line in lines:
+            rule = parse_filter(line, source)
+            if rule is not None:
+                self.add_rule(rule)
+
+    def add_filter_file(self, path):
+        """Parses and adds a filter list file, using its file name as the rule source."""
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            self.add_filter_text(f, os.path.basename(path))
+
+    def match_host(self, host, resource_type="other", first_party_host="", third_party=False):
+        """
+        Host-level part of match(): document allowlists and host-anchored rules.
+        The result depends only on the arguments, not on the URL path, so callers may cache it.
+        Returns a (block, exception) pair of rules, either of which may be None.
+        """
+        host = host.lower()
+        first_party_host = first_party_host.lower()
+        if first_party_host and self.document_exceptions:
+            allowed = self.document_exceptions.match(first_party_host)
+            if allowed is not None:
+                return None, allowed
+
+        block = self.block_hosts.match(host)
+        if block is not None and resource_type not in block.types:
+            block = None
+        exception = None
+        if host:
+            for suffix in host_suffixes(host):
+                for rule in self.host_rules.get(suffix) or ():
+                    if rule.is_exception:
+                        if exception is None and rule.matches("", "", resource_type, first_party_host, third_party):
+                            exception = rule
+                    elif block is None and rule.matches("", "", resource_type, first_party_host, third_party):
+                        block = rule
+        return block, exception
+
+    def _url_candidates(self, lowered_url):
+        candidates = []
+        token_rules = self.token_rules
+        for token in set(_TOKEN_RE.findall(lowered_url)):
+            rules = token_rules.get(token)
+            if rules:
+                candidates.extend(rules)
+        candidates.extend(self.generic_rules)
+        return candidates
+
+    def match(self, url, host, resource_type="other", first_party_host="", third_party=False, host_verdict=None):
+        """
+        Finds the rule deciding a request.
+        Returns the blocking rule, the exception rule allowing it, or None if nothing matched.
+        The request should be blocked only for a non-exception rule.
+        host_verdict may pass in a (cached) result of match_host() for the same request.
+        """
+        if host_verdict is None:
+            host_verdict = self.match_host(host, resource_type, first_party_host, third_party)
+        block, exception = host_verdict
+        if exception is not None:
+            return exception
+
+        first_party_host = first_party_host.lower()
+        lowered_url = url.lower()
+        candidates = self._url_candidates(lowered_url)
+        if block is None:
+            for rule in candidates:
+                if not rule.is_exception and rule.matches(url, lowered_url, resource_type, first_party_host, third_party):
+                    block = rule
+                    break
+            if block is None:
+                return None
+        for rule in candidates:
+            if rule.is_exception and rule.matches(url, lowered_url, resource_type, first_party_host, third_party):
+                return rule
+        return block
+
+
+def _types_to_mask(types):
+    return sum(1 << i for i, name in enumerate(_RESOURCE_TYPE_ORDER) if name in types)
+
+
+def _mask_to_types(mask):
+    types = frozenset(name for i, name in enumerate(_RESOURCE_TYPE_ORDER) if mask & (1 << i))
+    # Share the common sets instead of keeping one copy per rule.
+    if types == DEFAULT_RESOURCE_TYPES:
+        return DEFAULT_RESOURCE_TYPES
+    if types == RESOURCE_TYPES:
+        return RESOURCE_TYPES
+    return types
+
+
+def _host_hash(host):
+    return int.from_bytes(hashlib.blake2b(host.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MappedDomainSet:
+    """
+    Read-only DomainMatcher backed by a memory-mapped snapshot.
+    Hosts are stored as a sorted array of 64-bit hashes next to an array of rule source ids,
+    so loading costs nothing and the pages are shared by every process mapping the file.
+    """
+    def __init__(self, hashes, source_ids, sources):
+        self.hashes = hashes
+        self.source_ids = source_ids
+        self.sources = sources
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def match(self, host):
+        """Returns a rule for the most specific domain covering host, or None."""
+        if not host:
+            return None
+        hashes = self.hashes
+        for suffix in host_suffixes(host.lower().rstrip(".")):
+            value = _host_hash(suffix)
+            i = bisect.bisect_left(hashes, value)
+            if i < len(hashes) and hashes[i] == value:
+                source_id = self.source_ids[i]
+                blocks_documents = source_id & _BLOCKS_DOCUMENTS_FLAG
+                rule = FilterRule(suffix if blocks_documents else f"||{suffix}^",
+                                  self.sources[source_id & ~_BLOCKS_DOCUMENTS_FLAG])
+                rule.host = suffix
+                rule.types = RESOURCE_TYPES if blocks_documents else DEFAULT_RESOURCE_TYPES
+                return rule
+        return None
+
+
+def filter_sources_checksum(entries, paths):
+    """Hashes the ad domain entries and the contents of every filter list file."""
+    digest = hashlib.sha256()
+    digest.update(struct.pack("<I", SNAPSHOT_VERSION))
+    for entry in entries:
+        digest.update(entry.encode("utf-8", "replace"))
+        digest.update(b"\n")
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def _rule_state(rule, source_id):
+    return (rule.text, source_id, rule.is_exception, rule.host, rule.pattern, rule.token,
+            rule.match_case, _types_to_mask(rule.types), rule.third_party,
+            tuple(rule.include_domains) if rule.include_domains is not None else None,
+            tuple(rule.exclude_domains) if rule.exclude_domains is not None else None)
+
+
+def _rule_from_state(state, sources):
+    (text, source_id, is_exception, host, pattern, token, match_case, types,
+     third_party, include_domains, exclude_domains) = state
+    rule = FilterRule(text, sources[source_id])
+    rule.is_exception = is_exception
+    rule.host = host
+    rule.pattern = pattern
+    rule.token = token
+    rule.match_case = match_case
+    rule.types = _mask_to_types(types)
+    rule.third_party = third_party
+    rule.include_domains = frozenset(include_domains) if include_domains is not None else None
+    rule.exclude_domains = frozenset(exclude_domains) if exclude_domains is not None else None
+    return rule
+
+
+class _LazyRuleIndex(dict):
+    """
+    Rule bucket index loaded from a snapshot.
+    Buckets stay in their serialized form until a request first looks them up,
+    so startup does not pay for rebuilding tens of thousands of rule objects.
+    """
+    def __init__(self, states, sources):
+        super().__init__()
+        self._states = states
+        self._sources = sources
+
+    def get(self, key, default=None):
+        rules = dict.get(self, key)
+        if rules is None:
+            states = self._states.pop(key, None)
+            if states is None:
+                return default
+            rules = [_rule_from_state(state, self._sources) for state in states]
+            self[key] = rules
+        return rules
+
+
+def save_snapshot(engine, path, checksum):
+    """Writes a compiled engine to a versioned snapshot file, replacing it atomically."""
+    sources = []
+    source_ids = {}
+
+    def source_id(source):
+        if source not in source_ids:
+            source_ids[source] = len(sources)
+            sources.append(source)
+        return source_ids[source]
+
+    def bucket_states(buckets):
+        return {key: [_rule_state(rule, source_id(rule.source)) for rule in rules] for key, rules in buckets.items()}
+
+    hosts = sorted((_host_hash(host), host, rule) for host, rule in engine.block_hosts.domains.items())
+    host_ids = []
+    for _, _, rule in hosts:
+        flag = _BLOCKS_DOCUMENTS_FLAG if "document" in rule.types else 0
+        host_ids.append(source_id(rule.source) | flag)
+
+    payload = marshal.dumps((
+        engine.rule_count,
+        bucket_states(engine.host_rules),
+        bucket_states(engine.token_rules),
+        [_rule_state(rule, source_id(rule.source)) for rule in engine.generic_rules],
+        [_rule_state(rule, source_id(rule.source)) for rule in engine.document_exceptions.domains.values()],
+        sources,
+    ))
+
+    hash_bytes = struct.pack(f"<{len(hosts)}Q", *(value for value, _, _ in hosts))
+    id_bytes = struct.pack(f"<{len(hosts)}H", *host_ids)
+    padding = b"\0" * (-(len(hash_bytes) + len(id_bytes)) % 8)
+    rules_offset = _SNAPSHOT_HEADER.size + len(hash_bytes) + len(id_bytes) + len(padding)
+    header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, checksum, len(hosts), rules_offset, len(payload))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(hash_bytes)
+        f.write(id_bytes)
+        f.write(padding)
+        f.write(payload)
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path, checksum):
+    """
+    Maps a snapshot written by save_snapshot into a FilterEngine.
+    Returns None if the file is missing, corrupt, from another version or built from other sources.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, stored_checksum, host_count, rules_offset, rules_length = \
+            _SNAPSHOT_HEADER.unpack_from(mapped, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or stored_checksum != checksum:
+            return None
+        hashes_end = _SNAPSHOT_HEADER.size + host_count * 8
+        ids_end = hashes_end + host_count * 2
+        if rules_offset < ids_end or rules_offset + rules_length > len(mapped):
+            return None
+        rule_count, host_states, token_states, generic_states, document_states, sources = \
+            marshal.loads(mapped[rules_offset:rules_offset + rules_length])
+    except (struct.error, ValueError, EOFError, TypeError):
+        return None
+
+    view = memoryview(mapped)
+    engine = FilterEngine()
+    engine.rule_count = rule_count
+    engine.block_hosts = MappedDomainSet(view[_SNAPSHOT_HEADER.size:hashes_end].cast("Q"),
+                                         view[hashes_end:ids_end].cast("H"), sources)
+    engine.host_rules = _LazyRuleIndex(host_states, sources)
+    engine.token_rules = _LazyRuleIndex(token_states, sources)
+    engine.generic_rules = [_rule_from_state(state, sources) for state in generic_states]
+    for state in document_states:
+        rule = _rule_from_state(state, sources)
+        engine.document_exceptions.add(rule.host, rule)
+    return engine
+
+
+class InterceptorStats:
+    """
+    Hot-path measurements for the request interceptor: a latency histogram,
+    blocked/allowed counts per rule source and the most blocked hosts.
+    """
+    # Upper bounds of the latency buckets in microseconds; the last bucket is open-ended.
+    BUCKET_BOUNDS_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.histogram = [0] * (len(self.BUCKET_BOUNDS_US) + 1)
+        self.requests = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.unmatched = 0
+        self.blocked_by_source = Counter()
+        self.allowed_by_source = Counter()
+        self.blocked_hosts = Counter()
+
+    def record(self, elapsed_ns, host, blocked, source):
+        """Records one request. source is the list that decided it, or None if no rule matched."""
+        self.requests += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        self.histogram[bisect.bisect_left(self.BUCKET_BOUNDS_US, elapsed_ns / 1000)] += 1
+        if blocked:
+            self.blocked_by_source[source] += 1
+            self.blocked_hosts[host] += 1
+        elif source is None:
+            self.unmatched += 1
+        else:
+            self.allowed_by_source[source] += 1
+
+    def percentile_us(self, fraction):
+        """Returns the upper bound of the bucket containing the given latency percentile."""
+        if not self.requests:
+            return 0
+        threshold = fraction * self.requests
+        seen = 0
+        for bound, count in zip(self.BUCKET_BOUNDS_US, self.histogram):
+            seen += count
+            if seen >= threshold:
+                return bound
+        return self.max_ns // 1000
+
+    def to_dict(self, top_hosts=20):
+        buckets = [f"<= {bound} us" for bound in self.BUCKET_BOUNDS_US] + [f"> {self.BUCKET_BOUNDS_US[-1]} us"]
+        return {
+            "requests": self.requests,
+            "mean_us": round(self.total_ns / self.requests / 1000, 2) if self.requests else 0,
+            "p50_us": self.percentile_us(0.5),
+            "p95_us": self.percentile_us(0.95),
+            "p99_us": self.percentile_us(0.99),
+            "max_us": round(self.max_ns / 1000, 2),
+            "latency_histogram": dict(zip(buckets, self.histogram)),
+            "blocked": sum(self.blocked_by_source.values()),
+            "blocked_by_source": dict(self.blocked_by_source),
+            "allowed_by_source": dict(self.allowed_by_source),
+            "unmatched": self.unmatched,
+            "top_blocked_hosts": dict(self.blocked_hosts.most_common(top_hosts)),
+        }
@@ -0,0 +1,175 @@
+"""
+Netscape bookmark file (bookmarks.html) import and export, as written by all major browsers.
+The reader feeds the file to html.parser in chunks and the writer streams to disk, so memory
+does not grow with the file size beyond the bookmarks themselves. Nothing here touches Qt.
+"""
+import codecs
+import os
+from html import escape
+from html.parser import HTMLParser
+
+from bookmarks import make_entry
+
+READ_CHUNK_SIZE = 256 * 1024
+MAX_TITLE_LENGTH = 4096
+
+
+class BookmarkFileCancelled(Exception):
+    """Raised when is_cancelled() returns True during an import or export."""
+
+
+class NetscapeBookmarkParser(HTMLParser):
+    """
+    Incremental parser for the <DL>/<DT> bookmark tree.
+    A <H3> names the folder opened by the next <DL>. Parsed entries accumulate in
+    self.entries and can be taken with take_entries() after each feed().
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.folder_stack = [] # Folder name per open <DL>, None for unnamed lists
+        self.pending_folder = None
+        self.open_tag = None # "a" or "h3" while collecting its text
+        self.href = None
+        self.text = []
+        self.text_length = 0
+        self.entries = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.open_tag = tag
+            self.href = dict(attrs).get("href")
+            self._start_text()
+        elif tag == "h3":
+            self.open_tag = tag
+            self._start_text()
+        elif tag == "dl":
+            self.folder_stack.append(self.pending_folder)
+            self.pending_folder = None
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self.open_tag == "a":
+            if self.href:
+                self.entries.append(make_entry(self.href, self._take_text(), self.current_folder()))
+            self.open_tag = None
+            self.href = None
+        elif tag == "h3" and self.open_tag == "h3":
+            self.pending_folder = self._take_text() or "Untitled folder"
+            self.open_tag = None
+        elif tag == "dl" and self.folder_stack:
+            self.folder_stack.pop()
+
+    def handle_data(self, data):
+        if self.open_tag and self.text_length < MAX_TITLE_LENGTH:
+            self.text.append(data)
+            self.text_length += len(data)
+
+    def _start_text(self):
+        self.text = []
+        self.text_length = 0
+
+    def _take_text(self):
+        text = " ".join("".join(self.text).split())[:MAX_TITLE_LENGTH]
+        self._start_text()
+        return text
+
+    def current_folder(self):
+        return [name for name in self.folder_stack if name is not None]
+
+    def take_entries(self):
+        entries = self.entries
+        self.entries = []
+        return entries
+
+
+def iter_bookmarks_html(path, progress=None, is_cancelled=None, encoding="utf-8"):
+    """
+    Yields {"url", "title", "folder"} entries from a bookmarks.html file.
+    progress(bytes_read, total_bytes) is called after each chunk; is_cancelled() is polled between chunks.
+    """
+    total = os.path.getsize(path)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    parser = NetscapeBookmarkParser()
+    done = 0
+    with open(path, "rb") as f:
+        while True:
+            if is_cancelled is not None and is_cancelled():
+                raise BookmarkFileCancelled("Import cancelled.")
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            done += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            yield from parser.take_entries()
+            if progress is not None:
+                progress(done, total)
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.take_entries()
+
+
+def _folder_tree(entries):
+    """Groups entries into nested folders, keeping the order in which items first appear."""
+    root = {"folders": {}, "items": []}
+    for entry in entries:
+        node = root
+        for name in entry.get("folder", ()):
+            child = node["folders"].get(name)
+            if child is None:
+                child = {"folders": {}, "items": []}
+                node["folders"][name] = child
+                node["items"].append(("folder", name, child))
+            node = child
+        node["items"].append(("entry", entry, None))
+    return root
+
+
+def write_bookmarks_html(path, entries, progress=None, is_cancelled=None):
+    """
+    Writes entries as a Netscape bookmark file with escaped titles and URLs.
+    The file is written next to path and renamed into place when complete.
+    progress(written, total) is called periodically.
+    """
+    entries = list(entries)
+    total = len(entries)
+    tree = _folder_tree(entries)
+    temp_path = f"{path}.tmp"
+    written = 0
+    try:
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+                    '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+                    "<TITLE>Bookmarks</TITLE>\n"
+                    "<H1>Bookmarks</H1>\n"
+                    "<DL><p>\n")
+            stack = [(iter(tree["items"]), 1)]
+            while stack:
+                items, depth = stack[-1]
+                item = next(items, None)
+                indent = "    " * depth
+                if item is None:
+                    stack.pop()
+                    if stack:
+                        f.write(f"{'    ' * (depth - 1)}</DL><p>\n")
+                    continue
+                kind, value, node = item
+                if kind == "folder":
+                    f.write(f"{indent}<DT><H3>{escape(value)}</H3>\n{indent}<DL><p>\n")
+                    stack.append((iter(node["items"]), depth + 1))
+                    continue
+                f.write(f'{indent}<DT><A HREF="{escape(value["url"])}">{escape(value.get("title", ""))}</A>\n')
+                written += 1
+                if written % 1000 == 0:
+                    if is_cancelled is not None and is_cancelled():
+                        raise BookmarkFileCancelled("Export cancelled.")
+                    if progress is not None:
+                        progress(written, total)
+            f.write("</DL><p>\n")
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if progress is not None:
+        progress(total, total)
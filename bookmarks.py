@@ -0,0 +1,61 @@
+"""
+In-memory bookmark store keyed by URL.
+Entries are the {"url", "title"} dicts DataManager persists, with an optional "folder" list
+(outermost folder first). Duplicate checks are O(1); imports go through add_many.
+"""
+
+
+def _folder_path(folder):
+    if not folder:
+        return ()
+    if isinstance(folder, str):
+        return (folder,)
+    return tuple(str(name) for name in folder)
+
+
+def make_entry(url, title, folder=()):
+    entry = {"url": url, "title": title or url}
+    folder = _folder_path(folder)
+    if folder:
+        entry["folder"] = list(folder)
+    return entry
+
+
+class BookmarkStore:
+    """
+    Bookmarks in insertion order, indexed by URL (a URL is bookmarked at most once).
+    Iterating yields the entry dicts, oldest first.
+    """
+    def __init__(self, entries=()):
+        self.by_url = {} # {url: entry}; dicts keep insertion order
+        self.add_many(entries)
+
+    def __len__(self):
+        return len(self.by_url)
+
+    def __iter__(self):
+        return iter(self.by_url.values())
+
+    def __reversed__(self):
+        return reversed(self.by_url.values())
+
+    def add(self, url, title, folder=()):
+        """Adds a bookmark and returns its entry, or None if the URL is already bookmarked."""
+        if not url or url in self.by_url:
+            return None
+        entry = make_entry(url, title, folder)
+        self.by_url[url] = entry
+        return entry
+
+    def add_many(self, entries):
+        """Adds {"url", "title", "folder"} dicts in one pass, skipping known URLs. Returns the added entries."""
+        added = []
+        for entry in entries:
+            entry = self.add(entry.get("url"), entry.get("title", ""), entry.get("folder", ()))
+            if entry is not None:
+                added.append(entry)
+        return added
+
+    def to_list(self):
+        """Entries as a list for DataManager.save_bookmarks."""
+        return list(self.by_url.values())
@@ -3,17 +3,23 @@ import json
 import sys
 from datetime import datetime
 import shutil
-import re
 import hashlib
-import zipfile
+import time
+import sqlite3
+import base64
+import binascii
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLineEdit, QLabel, QTabWidget, QScrollArea, QDockWidget, QListWidget,
-                             QProgressBar, QMenu, QMessageBox, QListWidgetItem, QFileDialog, QCompleter,
+                             QProgressBar, QMenu, QMessageBox, QListWidgetItem, QFileDialog, QCompleter, QProgressDialog,
                              QStyleFactory, QDialog, QFormLayout, QComboBox, QSpinBox, QToolButton,
-                             QCheckBox, QInputDialog, QGroupBox, QSizePolicy, QFontComboBox)
+                             QCheckBox, QInputDialog, QGroupBox, QSizePolicy, QFontComboBox, QPlainTextEdit)
 from PyQt6.QtGui import QIcon, QKeySequence, QShortcut, QCursor, QDesktopServices, QAction, QFont
-from PyQt6.QtCore import Qt, QPoint, QUrl, QTimer, QRect, pyqtSignal, QSize, QDateTime, QStandardPaths
+from PyQt6.QtCore import (Qt, QPoint, QUrl, QTimer, QRect, pyqtSignal, QSize, QDateTime, QStandardPaths, QByteArray, QThread,
+                          QObject, QAbstractListModel, QModelIndex, QDataStream, QIODevice)
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import (QWebEnginePage, QWebEngineProfile, QWebEngineSettings,
                                    QWebEngineScript, QWebEngineScriptCollection, QWebEngineUrlRequestInterceptor,
@@ -24,6 +30,53 @@ from config import (APP_NAME, DATA_DIR, ICONS_DIR, STYLES_DIR, EXTENSIONS_DIR, C
                     CACHE_DIR, STORAGE_DIR, SEARCH_ENGINE_URLS,
                     TAB_BUTTON_WIDTH, TAB_BUTTON_HEIGHT, SUSPEND_CHECK_INTERVAL, RESIZE_BORDER)
 from data_manager import DataManager
+from write_behind import WriteBehindDataManager
+from adblock import FilterEngine, InterceptorStats, filter_sources_checksum, load_snapshot, save_snapshot
+from public_suffix import default_list as load_public_suffix_list, is_same_site
+from match_patterns import MatchPattern
+from crx import extract_extension
+from history_store import HistoryStore, MAX_PAGE_TEXT
+from bookmarks import BookmarkStore
+from bookmark_html import iter_bookmarks_html, write_bookmarks_html
+from session import SessionJournal
+from closed_tabs import ClosedTabStack
+from memory_pressure import read_process_rss, read_system_memory, bytes_over_budget, select_tabs_to_discard
+from suggestions import (SuggestionIndex, SuggestionPipeline, IndexSource, OpenTabsSource, KeywordSource,
+                         RemoteSource, keyword_url)
+
+HISTORY_SYNC_LIMIT = 1000 # Recent visits exported to DataManager for cloud sync
+SUGGESTION_HISTORY_LIMIT = 20000 # Most visited URLs loaded into the suggestion index; later visits add to it
+SESSION_WRITE_DELAY = 500 # ms; tab changes within this window are written to the session journal together
+LAZY_TAB_PRELOAD_INTERVAL = 2000 # ms between background loads of restored tabs
+MEMORY_CHECK_INTERVAL = 15000 # ms between renderer memory samples
+MIN_AVAILABLE_MEMORY_FRACTION = 0.10 # Discard tabs when less than this share of system memory is available
+# Evaluates to true if any form field in the page (or a same-origin frame) differs from its initial value
+DIRTY_FORMS_SCRIPT = """
+(() => {
+    const dirty = doc => Array.from(doc.querySelectorAll("input, textarea, select")).some(el => {
+        if (el.tagName === "SELECT") return Array.from(el.options).some(o => o.selected !== o.defaultSelected);
+        if (el.type === "checkbox" || el.type === "radio") return el.checked !== el.defaultChecked;
+        if (["hidden", "submit", "button", "reset", "image", "file"].includes(el.type)) return false;
+        return el.value !== el.defaultValue;
+    });
+    const frames = Array.from(document.querySelectorAll("iframe")).map(f => { try { return f.contentDocument; } catch (e) { return null; } });
+    return [document, ...frames].some(doc => doc && dirty(doc));
+})()
+"""
+
+def serialize_page_history(page):
+    """Back/forward history of a page (entries, current index, per-entry state) as bytes."""
+    data = QByteArray()
+    stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
+    stream << page.history()
+    return bytes(data)
+
+
+def restore_page_history(page, data):
+    """Loads history written by serialize_page_history into a page and navigates to its current entry."""
+    stream = QDataStream(QByteArray(data), QIODevice.OpenModeFlag.ReadOnly)
+    stream >> page.history()
+
 
 # Helper function for icons (can stay here or move to a utils file)
 def find_icon(button_name):
@@ -57,6 +110,106 @@ def find_icon(button_name):
             return QIcon('<svg width="24" height="24" viewBox="0 0 24 24" fill="#FF0000" xmlns="http://www.w3.org/2000/svg"><rect x="2" y="2" width="20" height="20" rx="2"/></svg>')
     return default_icon_path
 
+class SuggestionListModel(QAbstractListModel):
+    """
+    Suggestions shown in a completer popup, merged from several sources as their results arrive.
+    Rows are grouped in SOURCE_ORDER, duplicate URLs are shown once. Completes to the URL.
+    """
+    SOURCE_ORDER = ["keywords", "tabs", "history", "bookmarks", "remote"]
+    MAX_ROWS = 12
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.generation = None
+        self.results = {} # {source name: [SuggestionItem]}
+        self.items = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if item.source == "remote" or not item.title:
+                return item.title or item.url
+            return f"{item.title} - {item.url}"
+        if role == Qt.ItemDataRole.EditRole:
+            return item.url
+        return None
+
+    def set_results(self, generation, source, items):
+        """Adds one source's results; results of an older generation are replaced."""
+        if generation != self.generation:
+            self.generation = generation
+            self.results = {}
+        self.results[source] = items
+        merged = []
+        seen = set()
+        for name in self.SOURCE_ORDER:
+            for item in self.results.get(name, ()):
+                if item.url not in seen:
+                    seen.add(item.url)
+                    merged.append(item)
+        self.beginResetModel()
+        self.items = merged[:self.MAX_ROWS]
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.generation = None
+        self.results = {}
+        self.items = []
+        self.endResetModel()
+
+
+class SuggestionCompleter(QCompleter):
+    """
+    Completer for a line edit backed by a SuggestionPipeline.
+    Keystrokes only restart a debounce timer; the query runs on worker threads and each
+    source's results are merged into the popup when they arrive. A newer query cancels older ones.
+    """
+    DEBOUNCE_MS = 60
+    results_ready = pyqtSignal(int, str, list) # Emitted from worker threads, delivered on the GUI thread
+
+    def __init__(self, sources, executor, line_edit, context_provider):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.context_provider = context_provider # Called on the GUI thread, returns the context dict for the sources
+        self.pipeline = SuggestionPipeline(sources, executor, self.results_ready.emit)
+        self.suggestion_model = SuggestionListModel(self)
+        self.setModel(self.suggestion_model)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.start_query)
+        self.results_ready.connect(self.on_results)
+        line_edit.setCompleter(self)
+        line_edit.textEdited.connect(self.on_text_edited)
+
+    def on_text_edited(self, text):
+        if text.strip():
+            self.debounce_timer.start()
+        else:
+            self.debounce_timer.stop()
+            self.pipeline.cancel()
+            self.suggestion_model.clear()
+            self.popup().hide()
+
+    def start_query(self):
+        self.pipeline.request(self.line_edit.text().strip(), self.context_provider())
+
+    def on_results(self, generation, source, items):
+        if generation != self.pipeline.generation:
+            return
+        self.suggestion_model.set_results(generation, source, items)
+        if self.suggestion_model.rowCount() and self.line_edit.hasFocus():
+            self.complete()
+
+
 class HomePage(QWidget):
     """
     A custom home page widget for the browser, featuring a logo and a search bar.
@@ -64,10 +217,9 @@ class HomePage(QWidget):
     """
     search_triggered = pyqtSignal(str)
 
-    def __init__(self, history_data, bookmarks_data):
+    def __init__(self):
         super().__init__()
-        self.history = history_data
-        self.bookmarks = bookmarks_data
+        self.completer = None # Attached by DoorsBrowser (SuggestionCompleter)
         self.init_ui()
 
     def init_ui(self):
@@ -89,19 +241,9 @@ class HomePage(QWidget):
         layout.addWidget(self.search_bar)
 
         layout.addStretch()
-        self.setup_completer()
         self.setLayout(layout)
         self.setObjectName("homePage")
 
-    def setup_completer(self):
-        """Sets up the completer for the search bar based on history and bookmarks."""
-        suggestions = list(set([entry["url"] for entry in self.history] +
-                               [entry["url"] for entry in self.bookmarks] +
-                               ["Search Google for...", "Wikipedia", "YouTube"]))
-        self.completer = QCompleter(suggestions, self)
-        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.search_bar.setCompleter(self.completer)
-
     def trigger_search(self):
         """Emits the search_triggered signal with the current query."""
         query = self.search_bar.text().strip()
@@ -123,6 +265,7 @@ class SettingsDialog(QDialog):
     bookmark_import_html_requested = pyqtSignal()
     bookmark_export_html_requested = pyqtSignal()
     manage_site_permissions_requested = pyqtSignal()
+    adblock_diagnostics_requested = pyqtSignal()
 
     def __init__(self, current_settings, parent=None):
         super().__init__(parent)
@@ -164,6 +307,11 @@ class SettingsDialog(QDialog):
         self.startup_behavior_combo.setCurrentText(self.settings.get("startup_behavior", "Open Homepage"))
         layout.addRow("On Startup:", self.startup_behavior_combo)
 
+        self.preload_restored_tabs_spinbox = QSpinBox()
+        self.preload_restored_tabs_spinbox.setRange(0, 10)
+        self.preload_restored_tabs_spinbox.setValue(self.settings.get("preload_restored_tabs", 3))
+        layout.addRow("Preload Restored Tabs:", self.preload_restored_tabs_spinbox)
+
         self.homepage_url_edit = QLineEdit(self.settings.get("homepage_url", "about:home"))
         layout.addRow("Homepage URL:", self.homepage_url_edit)
 
@@ -172,12 +320,16 @@ class SettingsDialog(QDialog):
         self.search_engine_combo.setCurrentText(self.settings.get("default_search_engine", "yahoo"))
         layout.addRow("Default Search Engine:", self.search_engine_combo)
 
+        self.search_suggestions_url_edit = QLineEdit(self.settings.get("search_suggestions_url", ""))
+        self.search_suggestions_url_edit.setPlaceholderText("Off (e.g. https://example.com/suggest?q={query})")
+        layout.addRow("Search Suggestions URL:", self.search_suggestions_url_edit)
+
         self.max_tabs_spinbox = QSpinBox()
         self.max_tabs_spinbox.setRange(5, 100)
         self.max_tabs_spinbox.setValue(self.settings.get("max_tabs", 30))
         layout.addRow("Maximum Tabs:", self.max_tabs_spinbox)
 
-        self.suspend_tabs_checkbox = QCheckBox("Suspend inactive tabs")
+        self.suspend_tabs_checkbox = QCheckBox("Freeze and discard inactive tabs")
         self.suspend_tabs_checkbox.setChecked(self.settings.get("suspend_inactive_tabs", True))
         layout.addRow("Memory Optimization:", self.suspend_tabs_checkbox)
 
@@ -185,7 +337,25 @@ class SettingsDialog(QDialog):
         self.suspend_timeout_spinbox.setRange(1, 60)
         self.suspend_timeout_spinbox.setSuffix(" minutes")
         self.suspend_timeout_spinbox.setValue(self.settings.get("suspend_timeout_minutes", 5))
-        layout.addRow("Suspend Timeout:", self.suspend_timeout_spinbox)
+        layout.addRow("Freeze After:", self.suspend_timeout_spinbox)
+
+        self.discard_timeout_spinbox = QSpinBox()
+        self.discard_timeout_spinbox.setRange(1, 240)
+        self.discard_timeout_spinbox.setSuffix(" minutes")
+        self.discard_timeout_spinbox.setValue(self.settings.get("discard_timeout_minutes", 30))
+        layout.addRow("Discard After:", self.discard_timeout_spinbox)
+
+        self.memory_pressure_checkbox = QCheckBox("Discard tabs when memory runs low")
+        self.memory_pressure_checkbox.setChecked(self.settings.get("discard_on_memory_pressure", True))
+        layout.addRow("Memory Pressure:", self.memory_pressure_checkbox)
+
+        self.memory_budget_spinbox = QSpinBox()
+        self.memory_budget_spinbox.setRange(0, 65536)
+        self.memory_budget_spinbox.setSingleStep(256)
+        self.memory_budget_spinbox.setSuffix(" MB")
+        self.memory_budget_spinbox.setSpecialValueText("Automatic (half of system memory)")
+        self.memory_budget_spinbox.setValue(self.settings.get("memory_budget_mb", 0))
+        layout.addRow("Tab Memory Budget:", self.memory_budget_spinbox)
 
         return widget
 
@@ -199,7 +369,11 @@ class SettingsDialog(QDialog):
 
         self.dnt_checkbox = QCheckBox("Send 'Do Not Track' request")
         self.dnt_checkbox.setChecked(self.settings.get("send_dnt_header", False))
-        layout.addRow("Tracking Protection:", self.dnt_checkbox)
+        layout.addRow("Do Not Track:", self.dnt_checkbox)
+
+        self.gpc_checkbox = QCheckBox("Send 'Global Privacy Control' signal")
+        self.gpc_checkbox.setChecked(self.settings.get("send_gpc_header", False))
+        layout.addRow("Global Privacy Control:", self.gpc_checkbox)
 
         self.block_third_party_cookies_checkbox = QCheckBox("Block third-party cookies")
         self.block_third_party_cookies_checkbox.setChecked(self.settings.get("block_third_party_cookies", False))
@@ -209,6 +383,10 @@ class SettingsDialog(QDialog):
         self.clear_cookies_on_exit_checkbox.setChecked(self.settings.get("clear_cookies_on_exit", False))
         layout.addRow("Cookies:", self.clear_cookies_on_exit_checkbox)
 
+        self.index_page_text_checkbox = QCheckBox("Index page text for history search")
+        self.index_page_text_checkbox.setChecked(self.settings.get("index_page_text", False))
+        layout.addRow("History:", self.index_page_text_checkbox)
+
         clear_data_layout = QHBoxLayout()
         clear_history_btn = QPushButton("Clear History")
         clear_history_btn.clicked.connect(lambda: self.clear_browsing_data("history"))
@@ -306,6 +484,10 @@ class SettingsDialog(QDialog):
         sync_layout.addWidget(sync_download_btn)
         layout.addRow("Synchronization:", sync_layout)
         
+        adblock_diagnostics_btn = QPushButton("Adblock Diagnostics...")
+        adblock_diagnostics_btn.clicked.connect(self.adblock_diagnostics_requested.emit)
+        layout.addRow("Diagnostics:", adblock_diagnostics_btn)
+
         reset_settings_btn = QPushButton("Reset All Settings to Default")
         reset_settings_btn.clicked.connect(self.reset_settings_to_default)
         layout.addRow("Reset:", reset_settings_btn)
@@ -340,15 +522,22 @@ class SettingsDialog(QDialog):
         """Saves the settings and emits the settings_updated signal."""
         new_settings = {
             "startup_behavior": self.startup_behavior_combo.currentText(),
+            "preload_restored_tabs": self.preload_restored_tabs_spinbox.value(),
             "homepage_url": self.homepage_url_edit.text().strip(),
             "default_search_engine": self.search_engine_combo.currentText(),
+            "search_suggestions_url": self.search_suggestions_url_edit.text().strip(),
             "max_tabs": self.max_tabs_spinbox.value(),
             "suspend_inactive_tabs": self.suspend_tabs_checkbox.isChecked(),
             "suspend_timeout_minutes": self.suspend_timeout_spinbox.value(),
+            "discard_timeout_minutes": self.discard_timeout_spinbox.value(),
+            "discard_on_memory_pressure": self.memory_pressure_checkbox.isChecked(),
+            "memory_budget_mb": self.memory_budget_spinbox.value(),
             "adblock_enabled": self.adblock_checkbox.isChecked(),
             "send_dnt_header": self.dnt_checkbox.isChecked(),
+            "send_gpc_header": self.gpc_checkbox.isChecked(),
             "block_third_party_cookies": self.block_third_party_cookies_checkbox.isChecked(),
             "clear_cookies_on_exit": self.clear_cookies_on_exit_checkbox.isChecked(),
+            "index_page_text": self.index_page_text_checkbox.isChecked(),
             "download_path": self.download_path_edit.text().strip(),
             "ask_save_location": self.ask_save_location_checkbox.isChecked(),
             "theme": self.theme_combo.currentText(),
@@ -434,66 +623,359 @@ class SitePermissionsDialog(QDialog):
         self.data_manager.save_site_permissions(self.permissions_data)
         QMessageBox.information(self, "Site Permissions", "Permissions saved. Restart browser for full effect on existing tabs.")
 
+# Privacy signal headers, encoded once instead of on every request.
+DNT_HEADER = QByteArray(b"DNT")
+GPC_HEADER = QByteArray(b"Sec-GPC")
+PRIVACY_HEADER_ON = QByteArray(b"1")
+
+ResourceType = QWebEngineUrlRequestInfo.ResourceType
+# Maps Qt resource types onto the type names used by filter list options.
+FILTER_RESOURCE_TYPES = {
+    ResourceType.ResourceTypeMainFrame: "document",
+    ResourceType.ResourceTypeSubFrame: "subdocument",
+    ResourceType.ResourceTypeStylesheet: "stylesheet",
+    ResourceType.ResourceTypeScript: "script",
+    ResourceType.ResourceTypeImage: "image",
+    ResourceType.ResourceTypeFontResource: "font",
+    ResourceType.ResourceTypeSubResource: "other",
+    ResourceType.ResourceTypeObject: "object",
+    ResourceType.ResourceTypeMedia: "media",
+    ResourceType.ResourceTypeWorker: "script",
+    ResourceType.ResourceTypeSharedWorker: "script",
+    ResourceType.ResourceTypePrefetch: "other",
+    ResourceType.ResourceTypeFavicon: "image",
+    ResourceType.ResourceTypeXhr: "xmlhttprequest",
+    ResourceType.ResourceTypePing: "ping",
+    ResourceType.ResourceTypeServiceWorker: "script",
+    ResourceType.ResourceTypeCspReport: "other",
+    ResourceType.ResourceTypePluginResource: "object",
+    ResourceType.ResourceTypeNavigationPreloadMainFrame: "document",
+    ResourceType.ResourceTypeNavigationPreloadSubFrame: "subdocument",
+}
+
 class AdBlockInterceptor(QWebEngineUrlRequestInterceptor):
     """
-    Intercepts web requests to block known ad domains and third-party cookies.
-    Also handles Do Not Track header.
+    Intercepts web requests to block ads using filter lists and third-party cookies.
+    Also attaches the Do Not Track and Global Privacy Control headers.
     """
     def __init__(self, data_manager, parent=None):
         super().__init__(parent)
         self.data_manager = data_manager
         self.ad_domains = set()
+        self.filter_engine = FilterEngine()
+        self.filter_lists_dir = os.path.join(DATA_DIR, "filter_lists")
+        self.snapshot_path = os.path.join(CACHE_DIR, "adblock.snapshot")
         self.adblock_enabled = True # Controlled by settings
         self.block_third_party_cookies_enabled = False
         self.send_dnt_header_enabled = False
+        self.send_gpc_header_enabled = False
+        self.privacy_headers = () # (name, value) pairs attached to every request
+        # LRU cache of per-origin decisions: (first-party host, request host, resource type) -> (host verdict, third party)
+        self.verdict_cache = OrderedDict()
+        self.verdict_cache_size = 4096
+        self.verdict_cache_hits = 0
+        self.verdict_cache_misses = 0
+        self.stats = None # InterceptorStats while instrumentation is enabled
+        load_public_suffix_list() # Compile the bundled list now rather than on the first request
         self.load_ad_domains()
 
     def load_ad_domains(self):
-        """Loads ad domains from a text file."""
+        """
+        Compiles the ad domain list and any EasyList/Adblock Plus lists found in the
+        filter_lists data folder into an indexed filter engine.
+        The compiled engine is cached as a memory-mapped snapshot and only rebuilt
+        when the sources change.
+        """
         self.ad_domains = self.data_manager.load_data()["ad_domains"]
-        # print(f"Loaded {len(self.ad_domains)} ad domains.") # Keep print, remove QMessageBox
+        list_paths = []
+        if os.path.isdir(self.filter_lists_dir):
+            list_paths = [os.path.join(self.filter_lists_dir, file_name)
+                          for file_name in sorted(os.listdir(self.filter_lists_dir)) if file_name.endswith(".txt")]
+        try:
+            checksum = filter_sources_checksum(self.ad_domains, list_paths)
+        except OSError as e:
+            print(f"Error reading filter lists: {e}")
+            checksum = None
+
+        engine = load_snapshot(self.snapshot_path, checksum) if checksum else None
+        if engine is None:
+            engine = FilterEngine()
+            for entry in self.ad_domains:
+                # The ad domain list may mix plain hosts with filter syntax.
+                if entry.startswith(("||", "@@", "|", "/")) or "^" in entry or "$" in entry:
+                    engine.add_filter_text([entry], "ad_domains")
+                else:
+                    engine.add_domain(entry, "ad_domains")
+            for path in list_paths:
+                try:
+                    engine.add_filter_file(path)
+                except OSError as e:
+                    print(f"Error loading filter list {os.path.basename(path)}: {e}")
+            if checksum:
+                try:
+                    save_snapshot(engine, self.snapshot_path, checksum)
+                except OSError as e:
+                    # On Windows the old snapshot cannot be replaced while another process maps it.
+                    print(f"Could not write adblock snapshot: {e}")
+        self.filter_engine = engine
+        self.clear_verdict_cache()
+        print(f"Loaded {len(engine)} adblock rules.")
 
     def set_adblock_enabled(self, enabled):
+        if enabled != self.adblock_enabled:
+            self.clear_verdict_cache()
         self.adblock_enabled = enabled
         print(f"Adblock enabled: {enabled}.")
 
     def set_block_third_party_cookies(self, enabled):
+        if enabled != self.block_third_party_cookies_enabled:
+            self.clear_verdict_cache()
         self.block_third_party_cookies_enabled = enabled
         print(f"Third-party cookies blocking: {'Enabled' if enabled else 'Disabled'}.")
 
     def set_send_dnt_header(self, enabled):
         self.send_dnt_header_enabled = enabled
+        self._update_privacy_headers()
         print(f"Do Not Track header: {'Enabled' if enabled else 'Disabled'}.")
 
+    def set_send_gpc_header(self, enabled):
+        self.send_gpc_header_enabled = enabled
+        self._update_privacy_headers()
+        print(f"Global Privacy Control header: {'Enabled' if enabled else 'Disabled'}.")
+
+    def _update_privacy_headers(self):
+        """Rebuilds the header list once per settings change so requests only replay it."""
+        headers = []
+        if self.send_dnt_header_enabled:
+            headers.append((DNT_HEADER, PRIVACY_HEADER_ON))
+        if self.send_gpc_header_enabled:
+            headers.append((GPC_HEADER, PRIVACY_HEADER_ON))
+        self.privacy_headers = tuple(headers)
+
+    def clear_verdict_cache(self):
+        """Drops all cached per-origin decisions. Hit/miss counters are kept."""
+        self.verdict_cache.clear()
+
+    def verdict_cache_stats(self):
+        """Returns the size and hit/miss counters of the per-origin verdict cache."""
+        lookups = self.verdict_cache_hits + self.verdict_cache_misses
+        return {
+            "size": len(self.verdict_cache),
+            "capacity": self.verdict_cache_size,
+            "hits": self.verdict_cache_hits,
+            "misses": self.verdict_cache_misses,
+            "hit_rate": self.verdict_cache_hits / lookups if lookups else 0.0,
+        }
+
+    def _get_verdict(self, first_party_host, request_host, resource_type):
+        """Returns the (host verdict, third party) pair for a request, from the LRU cache when possible."""
+        key = (first_party_host, request_host, resource_type)
+        verdict = self.verdict_cache.get(key)
+        if verdict is not None:
+            self.verdict_cache.move_to_end(key)
+            self.verdict_cache_hits += 1
+            return verdict
+
+        self.verdict_cache_misses += 1
+        third_party = self.is_third_party(first_party_host, request_host)
+        host_verdict = None
+        if self.adblock_enabled:
+            host_verdict = self.filter_engine.match_host(request_host, FILTER_RESOURCE_TYPES.get(resource_type, "other"),
+                                                         first_party_host, third_party)
+        verdict = (host_verdict, third_party)
+        self.verdict_cache[key] = verdict
+        if len(self.verdict_cache) > self.verdict_cache_size:
+            self.verdict_cache.popitem(last=False)
+        return verdict
+
+    @staticmethod
+    def is_third_party(first_party_host, request_host):
+        """Returns True if the request host has a different registrable domain (eTLD+1) than the first party."""
+        if not first_party_host:
+            return False
+        return not is_same_site(first_party_host, request_host)
+
+    def set_instrumentation_enabled(self, enabled):
+        """Starts or stops recording hot-path statistics. Stopping discards what was recorded."""
+        if enabled and self.stats is None:
+            self.stats = InterceptorStats()
+        elif not enabled:
+            self.stats = None
+        print(f"Adblock instrumentation: {'Enabled' if enabled else 'Disabled'}.")
+
+    def get_stats(self):
+        """Returns the recorded statistics together with rule and verdict cache figures."""
+        data = self.stats.to_dict() if self.stats is not None else {"instrumentation_enabled": False}
+        data["rule_count"] = len(self.filter_engine)
+        data["verdict_cache"] = self.verdict_cache_stats()
+        return data
+
+    def dump_stats(self, file_path):
+        """Writes get_stats() to a JSON file."""
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.get_stats(), f, indent=4)
+
     def interceptRequest(self, info):
-        """Blocks requests if their URL contains a known ad domain or if it's a third-party cookie request."""
-        url = info.requestUrl().toString()
-    
+        """Blocks requests matched by the ad filter rules or if it's a third-party cookie request."""
+        stats = self.stats
+        if stats is None:
+            self._intercept(info)
+            return
+        start = time.perf_counter_ns()
+        host, blocked, source = self._intercept(info)
+        stats.record(time.perf_counter_ns() - start, host, blocked, source)
+
+    def _intercept(self, info):
+        """
+        Applies the blocking decision to a request.
+        Returns (request host, blocked, source of the deciding rule or None) for instrumentation.
+        """
+        for name, value in self.privacy_headers:
+            info.setHttpHeader(name, value)
+
+        if not (self.adblock_enabled or self.block_third_party_cookies_enabled):
+            return "", False, None
+
+        request_url = info.requestUrl()
+        first_party_url = info.firstPartyUrl()
+        request_host = request_url.host()
+        first_party_host = first_party_url.host() if first_party_url.isValid() else ""
+        resource_type = info.resourceType()
+        host_verdict, third_party = self._get_verdict(first_party_host, request_host, resource_type)
+
+        rule = None
         if self.adblock_enabled:
-            for domain in self.ad_domains:
-                if domain in url:
-                    info.block(True)
-                    return
+            rule = self.filter_engine.match(request_url.toString(), request_host,
+                                            FILTER_RESOURCE_TYPES.get(resource_type, "other"),
+                                            first_party_host, third_party, host_verdict)
+            if rule is not None and not rule.is_exception:
+                info.block(True)
+                return request_host, True, rule.source
 
         if self.block_third_party_cookies_enabled:
-            first_party_url = info.firstPartyUrl()
-            request_url = info.requestUrl()
-
             if first_party_url.isValid() and request_url.isValid():
-                first_party_host = first_party_url.host()
-                request_host = request_url.host()
-
-                is_same_party = (first_party_host == request_host or
-                                request_host.endswith("." + first_party_host) or
-                                first_party_host.endswith("." + request_host))
+                is_same_party = not third_party
 
                 # نام صحیح در PyQt6:
-                if not is_same_party and info.resourceType() != QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame:
+                if not is_same_party and resource_type != QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame:
                     info.block(True)
-                    return
+                    return request_host, True, "third_party_cookies"
+
+        return request_host, False, rule.source if rule is not None else None
+
+class AdBlockStatsDialog(QDialog):
+    """A debug dialog showing request interceptor latency and blocking statistics."""
+    def __init__(self, interceptor, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Adblock Diagnostics")
+        self.setMinimumSize(500, 500)
+        self.interceptor = interceptor
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        self.record_checkbox = QCheckBox("Record request statistics")
+        self.record_checkbox.setChecked(self.interceptor.stats is not None)
+        self.record_checkbox.toggled.connect(self.toggle_recording)
+        layout.addWidget(self.record_checkbox)
+
+        self.stats_view = QPlainTextEdit()
+        self.stats_view.setReadOnly(True)
+        layout.addWidget(self.stats_view)
+
+        button_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.refresh)
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset_stats)
+        export_btn = QPushButton("Export JSON...")
+        export_btn.clicked.connect(self.export_stats)
+        button_layout.addWidget(refresh_btn)
+        button_layout.addWidget(reset_btn)
+        button_layout.addWidget(export_btn)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def toggle_recording(self, checked):
+        self.interceptor.set_instrumentation_enabled(checked)
+        self.refresh()
+
+    def refresh(self):
+        self.stats_view.setPlainText(json.dumps(self.interceptor.get_stats(), indent=4))
+
+    def reset_stats(self):
+        if self.interceptor.stats is not None:
+            self.interceptor.stats.reset()
+        self.refresh()
+
+    def export_stats(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Adblock Statistics", "adblock_stats.json", "JSON Files (*.json)")
+        if file_path:
+            try:
+                self.interceptor.dump_stats(file_path)
+                QMessageBox.information(self, "Adblock Diagnostics", f"Statistics exported to '{file_path}'.")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error exporting statistics: {e}")
+
+class ExtensionInstallThread(QThread):
+    """
+    Extracts a .crx/.zip extension package on a worker thread.
+    Reports progress in percent and can be cancelled with requestInterruption().
+    """
+    progress_changed = pyqtSignal(int)
+    completed = pyqtSignal(bool, str) # (success, error message)
+
+    def __init__(self, package_path, dest_dir, parent=None):
+        super().__init__(parent)
+        self.package_path = package_path
+        self.dest_dir = dest_dir
+        self.last_percent = -1
+
+    def run(self):
+        try:
+            extract_extension(self.package_path, self.dest_dir, self._report_progress, self.isInterruptionRequested)
+        except Exception as e:
+            self.completed.emit(False, str(e))
+            return
+        self.completed.emit(True, "")
+
+    def _report_progress(self, done, total):
+        percent = done * 100 // total
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.progress_changed.emit(percent)
+
+
+class BookmarkFileThread(QThread):
+    """
+    Runs a bookmark file import or export on a worker thread.
+    task(progress, is_cancelled) returns the result, which is kept in self.result.
+    """
+    progress_changed = pyqtSignal(int)
+    completed = pyqtSignal(bool, str) # (success, error message)
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self.result = None
+        self.last_percent = -1
+
+    def run(self):
+        try:
+            self.result = self.task(self._report_progress, self.isInterruptionRequested)
+        except Exception as e:
+            self.completed.emit(False, str(e))
+            return
+        self.completed.emit(True, "")
+
+    def _report_progress(self, done, total):
+        percent = done * 100 // total if total else 100
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.progress_changed.emit(percent)
 
-        
-        pass
 
 class ExtensionManager:
     """
@@ -501,46 +983,155 @@ class ExtensionManager:
     Loads extensions from manifests and injects content scripts.
     Supports .json manifests and basic .crx (zip) extraction.
     """
+    SCRIPT_NAME_PREFIX = "doors-ext:"
+    STAGING_PREFIX = ".installing-" # Packages are extracted here before being renamed into place
+    MANIFEST_CACHE_VERSION = 1
+    RUN_AT_INJECTION_POINTS = {
+        "document_start": QWebEngineScript.InjectionPoint.DocumentCreation,
+        "document_end": QWebEngineScript.InjectionPoint.DocumentReady,
+        "document_idle": QWebEngineScript.InjectionPoint.Deferred
+    }
+
     def __init__(self, profile, data_manager):
         super().__init__() # Call QObject.__init__ if inheriting from QObject
         self.profile = profile
         self.data_manager = data_manager
-        self.extensions = {} # {extension_id: {manifest_data, is_enabled, path_to_files}}
+        self.extensions = {} # {extension_id: {manifest_data, is_enabled, path_to_files, manifest_key, content_scripts}}
+        self.script_cache = {} # {script name: ((mtime, matches, run_at, all_frames), QWebEngineScript)}
+        self.saved_states = None # {extension_id: enabled} as last read from or written to DataManager
+        self.manifest_cache_path = os.path.join(CACHE_DIR, "extension_manifests.json")
+        self.manifest_cache = self._load_manifest_cache()
+        self.manifest_cache_dirty = False
+        self.install_threads = [] # Running ExtensionInstallThreads, kept alive until they finish
         self.load_extensions()
 
-    def load_extensions(self):
-        """Loads extension manifests from the extensions directory."""
-        self.extensions = {}
+    def load_extensions(self, reload_states=False):
+        """
+        Scans the extensions directory incrementally.
+        Manifests are only parsed when their (mtime, size) differs from the persisted manifest
+        cache, and extensions that did not change are left untouched. Saved enabled states are
+        read on the first scan, or when reload_states is set (e.g. after a cloud sync).
+        """
         if not os.path.exists(EXTENSIONS_DIR):
             os.makedirs(EXTENSIONS_DIR)
             return
 
-        saved_states = self.data_manager.load_data()["extensions_state"]
-        saved_states_map = {state["id"]: state["enabled"] for state in saved_states}
+        saved_states_map = None
+        if reload_states or self.saved_states is None:
+            saved_states = self.data_manager.load_data()["extensions_state"]
+            saved_states_map = {state["id"]: state["enabled"] for state in saved_states}
+            self.saved_states = saved_states_map
 
-        for ext_id in os.listdir(EXTENSIONS_DIR):
-            ext_path = os.path.join(EXTENSIONS_DIR, ext_id)
-            manifest_path = os.path.join(ext_path, "manifest.json")
-
-            if os.path.isdir(ext_path) and os.path.exists(manifest_path):
-                try:
-                    with open(manifest_path, "r", encoding="utf-8") as f:
-                        manifest = json.load(f)
-                        
-                        self.extensions[ext_id] = {
-                            "manifest": manifest,
-                            "is_enabled": saved_states_map.get(ext_id, True),
-                            "path_to_files": ext_path
-                        }
-                        print(f"Loaded extension: {ext_id} (Enabled: {self.extensions[ext_id]['is_enabled']})")
-                except Exception as e:
-                    print(f"Error loading extension manifest {ext_id}: {e}")
+        changed = False
+        found = set()
+        for entry in os.scandir(EXTENSIONS_DIR):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            ext_id = entry.name
+            enabled = saved_states_map.get(ext_id, True) if saved_states_map is not None else None
+            if ext_id in self.extensions and enabled is not None and self.extensions[ext_id]["is_enabled"] != enabled:
+                self.extensions[ext_id]["is_enabled"] = enabled
+                changed = True
+            if self.load_extension(ext_id, enabled):
+                changed = True
+            if ext_id in self.extensions:
+                found.add(ext_id)
+
+        for ext_id in [ext_id for ext_id in self.extensions if ext_id not in found]:
+            self._forget_extension(ext_id)
+            changed = True
+
+        self.save_manifest_cache()
+        if changed:
+            self.sync_profile_scripts()
         self.save_extension_states()
 
+    def load_extension(self, ext_id, enabled=None):
+        """
+        Loads or refreshes a single extension. Returns True if it was added, changed or removed.
+        When enabled is None the current state is kept (new extensions default to enabled).
+        """
+        ext_path = os.path.join(EXTENSIONS_DIR, ext_id)
+        manifest_path = os.path.join(ext_path, "manifest.json")
+        try:
+            stat = os.stat(manifest_path)
+        except OSError:
+            if ext_id in self.extensions:
+                self._forget_extension(ext_id)
+                return True
+            return False
+        key = [stat.st_mtime_ns, stat.st_size]
+
+        current = self.extensions.get(ext_id)
+        if current is not None and current["manifest_key"] == key:
+            return False
+
+        cached = self.manifest_cache.get(manifest_path)
+        if cached is not None and cached["key"] == key:
+            manifest = cached["manifest"]
+        else:
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except Exception as e:
+                print(f"Error loading extension manifest {ext_id}: {e}")
+                return False
+            self.manifest_cache[manifest_path] = {"key": key, "manifest": manifest}
+            self.manifest_cache_dirty = True
+
+        if enabled is None:
+            enabled = current["is_enabled"] if current is not None else True
+        self.extensions[ext_id] = {
+            "manifest": manifest,
+            "is_enabled": enabled,
+            "path_to_files": ext_path,
+            "manifest_key": key
+        }
+        self.build_content_scripts(ext_id)
+        print(f"Loaded extension: {ext_id} (Enabled: {enabled})")
+        return True
+
+    def _forget_extension(self, ext_id):
+        """Drops an extension and its cached manifest and scripts from memory."""
+        ext_data = self.extensions.pop(ext_id)
+        if self.manifest_cache.pop(os.path.join(ext_data["path_to_files"], "manifest.json"), None) is not None:
+            self.manifest_cache_dirty = True
+        for name in [name for name in self.script_cache if name.startswith(f"{self.SCRIPT_NAME_PREFIX}{ext_id}:")]:
+            del self.script_cache[name]
+
+    def _load_manifest_cache(self):
+        """Reads the persisted manifest cache ({manifest path: {key: [mtime_ns, size], manifest}})."""
+        try:
+            with open(self.manifest_cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == self.MANIFEST_CACHE_VERSION:
+                return cache["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
+
+    def save_manifest_cache(self):
+        """Persists the manifest cache if it changed since the last save."""
+        if not self.manifest_cache_dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.manifest_cache_path), exist_ok=True)
+            temp_path = f"{self.manifest_cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.MANIFEST_CACHE_VERSION, "entries": self.manifest_cache}, f)
+            os.replace(temp_path, self.manifest_cache_path)
+            self.manifest_cache_dirty = False
+        except OSError as e:
+            print(f"Error saving extension manifest cache: {e}")
+
     def save_extension_states(self):
-        """Saves the enabled/disabled state of extensions."""
-        states = [{"id": ext_id, "enabled": data["is_enabled"]} for ext_id, data in self.extensions.items()]
+        """Saves the enabled/disabled state of extensions, skipping the write when nothing changed."""
+        states_map = {ext_id: data["is_enabled"] for ext_id, data in self.extensions.items()}
+        if states_map == self.saved_states:
+            return
+        states = [{"id": ext_id, "enabled": enabled} for ext_id, enabled in states_map.items()]
         self.data_manager.save_extensions_state(states)
+        self.saved_states = states_map
 
     def get_extension_states(self):
         """Returns a list of (name, is_enabled, id) for all loaded extensions."""
@@ -550,84 +1141,180 @@ class ExtensionManager:
         """Enables or disables an extension by its ID."""
         if ext_id in self.extensions:
             self.extensions[ext_id]["is_enabled"] = enabled
+            self.sync_profile_scripts()
             self.save_extension_states()
             print(f"Extension '{self.extensions[ext_id]['manifest'].get('name', ext_id)}' {'enabled' if enabled else 'disabled'}.")
             return True
         return False
 
-    def apply_content_scripts(self, page: QWebEnginePage):
+    def build_content_scripts(self, ext_id):
         """
-        Injects content scripts for enabled extensions into the given QWebEnginePage.
-        This should be called when a new page loads.
+        Compiles the content scripts declared in an extension's manifest into cached
+        QWebEngineScript objects. URL filtering is embedded as a Greasemonkey header
+        (@match lines), which QtWebEngine evaluates itself for every frame.
         """
-        scripts = page.scripts()
-        for ext_id, ext_data in self.extensions.items():
-            if not ext_data["is_enabled"]:
+        ext_data = self.extensions[ext_id]
+        entries = []
+        for entry_index, script_data in enumerate(ext_data["manifest"].get("content_scripts", [])):
+            matches = []
+            for pattern in script_data.get("matches", []):
+                try:
+                    matches.append(MatchPattern(pattern).pattern)
+                except ValueError as e:
+                    print(f"Ignoring content script pattern of {ext_id}: {e}")
+            if not matches:
+                # A script without a valid @match would run on every page
                 continue
-
-            manifest = ext_data["manifest"]
-            content_scripts = manifest.get("content_scripts", [])
-
-            for script_data in content_scripts:
-                matches = script_data.get("matches", [])
-                js_file = script_data.get("js")
-
-                if js_file and any(self._matches_url(page.url().toString(), pattern) for pattern in matches):
-                    script_path = os.path.join(ext_data["path_to_files"], js_file)
-                    if os.path.exists(script_path):
-                        try:
-                            with open(script_path, "r", encoding="utf-8") as f:
-                                js_code = f.read()
-                                script = QWebEngineScript()
-                                script.setSourceCode(js_code)
-                                script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentReady)
-                                script.setRunsOnSubFrames(True)
-                                script.setWorldId(QWebEngineScript.ScriptWorldId.ApplicationWorld)
-                                scripts.insert(script)
-                        except Exception as e:
-                            print(f"Error reading content script {script_path} for {ext_id}: {e}")
-                    else:
-                        print(f"Content script file not found: {script_path} for extension {ext_id}")
-
-    def _matches_url(self, url, pattern):
-        """Simple wildcard matching for URLs (e.g., *://*.example.com/*)."""
-        pattern = pattern.replace('.', '\\.').replace('*', '.*')
-        return re.match(pattern, url) is not None
-
-    def install_extension_from_file(self, file_path):
-        """Installs an extension from a .json manifest or .crx file."""
+            js_files = script_data.get("js") or []
+            if isinstance(js_files, str):
+                js_files = [js_files]
+            entry = {
+                "matches": matches,
+                "run_at": script_data.get("run_at", "document_idle"),
+                "all_frames": bool(script_data.get("all_frames", False)),
+                "scripts": []
+            }
+            for js_file in js_files:
+                script_path = os.path.join(ext_data["path_to_files"], js_file)
+                name = f"{self.SCRIPT_NAME_PREFIX}{ext_id}:{entry_index}:{js_file}"
+                if self._get_cached_script(name, script_path, entry) is not None:
+                    entry["scripts"].append((name, script_path))
+            entries.append(entry)
+        ext_data["content_scripts"] = entries
+
+    def _get_cached_script(self, name, script_path, entry):
+        """
+        Returns the compiled script for a file. It is rebuilt only when the file's mtime or the
+        manifest values baked into it (matches, run_at, all_frames) changed.
+        """
         try:
-            ext_name = os.path.basename(file_path)
-            ext_id = ext_name.replace(".json", "").replace(".crx", "")
-
-            dest_dir = os.path.join(EXTENSIONS_DIR, ext_id)
-            if os.path.exists(dest_dir):
-                QMessageBox.warning(None, "Install Extension", f"Extension '{ext_id}' already exists. Please uninstall first.")
-                return False
+            mtime = os.path.getmtime(script_path)
+        except OSError:
+            print(f"Content script file not found: {script_path}")
+            self.script_cache.pop(name, None)
+            return None
+        key = (mtime, tuple(entry["matches"]), entry["run_at"], entry["all_frames"])
+        cached = self.script_cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
 
-            os.makedirs(dest_dir)
+        try:
+            with open(script_path, "r", encoding="utf-8") as f:
+                js_code = f.read()
+        except Exception as e:
+            print(f"Error reading content script {script_path}: {e}")
+            return None
+        header = ["// ==UserScript=="]
+        header += [f"// @match {pattern}" for pattern in entry["matches"]]
+        header.append("// ==/UserScript==")
+        script = QWebEngineScript()
+        script.setName(name)
+        script.setSourceCode("\n".join(header) + "\n" + js_code)
+        script.setInjectionPoint(self.RUN_AT_INJECTION_POINTS.get(entry["run_at"], QWebEngineScript.InjectionPoint.Deferred))
+        script.setRunsOnSubFrames(entry["all_frames"])
+        script.setWorldId(QWebEngineScript.ScriptWorldId.ApplicationWorld)
+        self.script_cache[name] = (key, script)
+        return script
+
+    def sync_profile_scripts(self):
+        """
+        Registers the content scripts of enabled extensions once on the profile, so every
+        tab shares them and they run at their declared injection point. Scripts of disabled
+        or removed extensions, and scripts whose file changed, are replaced.
+        """
+        wanted = {}
+        for ext_data in self.extensions.values():
+            if not ext_data["is_enabled"]:
+                continue
+            for entry in ext_data.get("content_scripts", []):
+                for name, script_path in entry["scripts"]:
+                    script = self._get_cached_script(name, script_path, entry)
+                    if script is not None:
+                        wanted[name] = script
+
+        scripts = self.profile.scripts()
+        for existing in scripts.toList():
+            name = existing.name()
+            if name.startswith(self.SCRIPT_NAME_PREFIX) and (name not in wanted or existing != wanted[name]):
+                scripts.remove(existing)
+        for name, script in wanted.items():
+            if not scripts.find(name):
+                scripts.insert(script)
+
+    def install_extension_from_file(self, file_path, on_installed=None, parent=None):
+        """
+        Installs an extension from a .json manifest or a .crx/.zip package.
+        Packages are extracted on a worker thread into a hidden staging directory, which is
+        renamed into EXTENSIONS_DIR only once extraction succeeded. on_installed(ext_id) is
+        called when the extension is ready. Returns False if the installation could not start.
+        """
+        ext_name = os.path.basename(file_path)
+        ext_id, ext_type = os.path.splitext(ext_name)
+        ext_type = ext_type.lower()
+        if not ext_id or ext_id.startswith("."):
+            QMessageBox.critical(None, "Installation Error", f"Invalid extension file name: {ext_name}")
+            return False
+        dest_dir = os.path.join(EXTENSIONS_DIR, ext_id)
+        staging_dir = os.path.join(EXTENSIONS_DIR, f"{self.STAGING_PREFIX}{ext_id}")
+        if os.path.exists(dest_dir) or os.path.exists(staging_dir):
+            QMessageBox.warning(None, "Install Extension", f"Extension '{ext_id}' already exists. Please uninstall first.")
+            return False
 
-            if file_path.endswith(".json"):
-                shutil.copy(file_path, os.path.join(dest_dir, "manifest.json"))
-            elif file_path.endswith(".crx"):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(dest_dir)
-                if not os.path.exists(os.path.join(dest_dir, "manifest.json")):
-                    QMessageBox.critical(None, "Installation Error", "CRX file does not contain manifest.json.")
-                    shutil.rmtree(dest_dir)
-                    return False
-            else:
-                QMessageBox.critical(None, "Installation Error", "Unsupported extension file type. Only .json or .crx are supported.")
-                shutil.rmtree(dest_dir)
+        if ext_type == ".json":
+            try:
+                os.makedirs(staging_dir)
+                shutil.copy(file_path, os.path.join(staging_dir, "manifest.json"))
+                os.replace(staging_dir, dest_dir)
+            except Exception as e:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                QMessageBox.critical(None, "Installation Error", f"Error installing extension: {e}")
                 return False
-
-            self.load_extensions()
-            QMessageBox.information(None, "Install Extension", f"Extension '{ext_id}' installed successfully.")
+            self._finish_install(ext_id, on_installed)
             return True
-        except Exception as e:
-            QMessageBox.critical(None, "Installation Error", f"Error installing extension: {e}")
+        if ext_type not in (".crx", ".zip"):
+            QMessageBox.critical(None, "Installation Error", "Unsupported extension file type. Only .json, .crx or .zip are supported.")
             return False
 
+        progress_dialog = QProgressDialog(f"Installing '{ext_id}'...", "Cancel", 0, 100, parent)
+        progress_dialog.setWindowTitle("Install Extension")
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(300)
+        install_thread = ExtensionInstallThread(file_path, staging_dir)
+        install_thread.progress_changed.connect(progress_dialog.setValue)
+        progress_dialog.canceled.connect(install_thread.requestInterruption)
+        install_thread.completed.connect(lambda ok, message: self._on_package_extracted(install_thread, progress_dialog, ext_id, ok, message, on_installed))
+        self.install_threads.append(install_thread)
+        install_thread.start()
+        return True
+
+    def _on_package_extracted(self, install_thread, progress_dialog, ext_id, ok, message, on_installed):
+        """Moves a finished extraction into place (runs on the GUI thread)."""
+        install_thread.wait()
+        self.install_threads.remove(install_thread)
+        progress_dialog.reset()
+        staging_dir = os.path.join(EXTENSIONS_DIR, f"{self.STAGING_PREFIX}{ext_id}")
+        if ok:
+            try:
+                os.replace(staging_dir, os.path.join(EXTENSIONS_DIR, ext_id))
+            except OSError as e:
+                message = str(e)
+                ok = False
+        if not ok:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            QMessageBox.critical(None, "Installation Error", f"Error installing extension: {message}")
+            return
+        self._finish_install(ext_id, on_installed)
+
+    def _finish_install(self, ext_id, on_installed):
+        """Loads a freshly installed extension and registers its scripts."""
+        self.load_extension(ext_id)
+        self.save_manifest_cache()
+        self.sync_profile_scripts()
+        self.save_extension_states()
+        QMessageBox.information(None, "Install Extension", f"Extension '{ext_id}' installed successfully.")
+        if on_installed is not None:
+            on_installed(ext_id)
+
     def uninstall_extension(self, ext_id):
         """Uninstalls an extension by its ID."""
         if ext_id in self.extensions:
@@ -637,7 +1324,9 @@ class ExtensionManager:
             if reply == QMessageBox.StandardButton.Yes:
                 try:
                     shutil.rmtree(self.extensions[ext_id]["path_to_files"])
-                    del self.extensions[ext_id]
+                    self._forget_extension(ext_id)
+                    self.save_manifest_cache()
+                    self.sync_profile_scripts()
                     self.save_extension_states()
                     QMessageBox.information(None, "Uninstall Extension", "Extension uninstalled successfully.")
                     return True
@@ -691,12 +1380,14 @@ class ExtensionsDialog(QDialog):
             self.parent().reapply_extension_scripts()
 
     def install_extension(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Extension File", "", "Extension Files (*.json *.crx)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Extension File", "", "Extension Files (*.json *.crx *.zip)")
         if file_path:
-            if self.extension_manager.install_extension_from_file(file_path):
-                self.load_extensions_list()
-                if self.parent() and hasattr(self.parent(), 'reapply_extension_scripts'):
-                    self.parent().reapply_extension_scripts()
+            self.extension_manager.install_extension_from_file(file_path, self.on_extension_installed, self)
+
+    def on_extension_installed(self, ext_id):
+        self.load_extensions_list()
+        if self.parent() and hasattr(self.parent(), 'reapply_extension_scripts'):
+            self.parent().reapply_extension_scripts()
 
     def uninstall_selected_extension(self):
         selected_item = self.list_widget.currentItem()
@@ -840,6 +1531,122 @@ class DownloadItem(QWidget):
         else:
             return f"{bytes_val / (1024**3):.2f} GB"
 
+class PageTextIndexer(QObject):
+    """
+    Feeds the text of loaded pages into the history full-text index.
+    Pages are queued and extracted one per timer tick, recently indexed URLs are skipped, and the
+    database writes run on a single worker thread with its own HistoryStore connection.
+    """
+    INTERVAL_MS = 1500
+    REINDEX_SECONDS = 30 * 60
+    MAX_PENDING = 20
+
+    def __init__(self, store_path, parent=None):
+        super().__init__(parent)
+        self.store_path = store_path
+        self.store = None # Opened lazily on the worker thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-text")
+        self.pending = OrderedDict() # {url: QWebEnginePage}
+        self.indexed_at = {} # {url: time.monotonic() of the last extraction}
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.INTERVAL_MS)
+        self.timer.timeout.connect(self.process_next)
+
+    def schedule(self, page):
+        url = page.url().toString()
+        if not url.startswith(("http://", "https://")):
+            return
+        last = self.indexed_at.get(url)
+        if last is not None and time.monotonic() - last < self.REINDEX_SECONDS:
+            return
+        self.pending[url] = page
+        self.pending.move_to_end(url)
+        while len(self.pending) > self.MAX_PENDING:
+            self.pending.popitem(last=False)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def process_next(self):
+        if not self.pending:
+            self.timer.stop()
+            return
+        url, page = self.pending.popitem(last=False)
+        try:
+            if page.url().toString() != url: # Navigated away since the load finished
+                return
+            self.indexed_at[url] = time.monotonic()
+            page.toPlainText(lambda text, url=url: self.executor.submit(self._store_text, url, text[:MAX_PAGE_TEXT]))
+        except RuntimeError: # The tab was closed
+            pass
+
+    def _store_text(self, url, text):
+        try:
+            if self.store is None:
+                self.store = HistoryStore(self.store_path)
+            self.store.set_page_text(url, text)
+        except sqlite3.Error as e:
+            print(f"Error indexing page text for {url}: {e}")
+
+    def _close_store(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def close(self):
+        self.timer.stop()
+        self.pending.clear()
+        self.executor.submit(self._close_store)
+        self.executor.shutdown(wait=True)
+
+
+class HistoryDialog(QDialog):
+    """Searchable view of the browsing history, ranked by the full-text index."""
+    SEARCH_DELAY_MS = 150
+
+    def __init__(self, history_store, open_url, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("History")
+        self.setMinimumSize(700, 450)
+        self.history_store = history_store
+        self.open_url = open_url
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.update_results)
+        self.init_ui()
+        self.update_results()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search history titles and page text...")
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_edit)
+        self.results_list = QListWidget()
+        self.results_list.itemActivated.connect(self.open_item)
+        layout.addWidget(self.results_list)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+    def update_results(self):
+        query = self.search_edit.text().strip()
+        entries = self.history_store.search(query, 100) if query else self.history_store.recent_visits(100)
+        self.results_list.clear()
+        for entry in entries:
+            item = QListWidgetItem(f"{entry['timestamp']} - {entry['title'] or entry['url']}\n{entry['url']}")
+            item.setData(Qt.ItemDataRole.UserRole, entry["url"])
+            if entry.get("snippet"):
+                item.setToolTip(entry["snippet"])
+            self.results_list.addItem(item)
+        if query:
+            self.status_label.setText(f"{len(entries)} matching pages")
+        else:
+            self.status_label.setText("Recent visits")
+
+    def open_item(self, item):
+        self.open_url(item.data(Qt.ItemDataRole.UserRole))
+
+
 class DownloadsDialog(QDialog):
     """A dialog to manage and display active and completed downloads."""
     def __init__(self, parent=None):
@@ -866,6 +1673,16 @@ class DownloadsDialog(QDialog):
         self.downloads_list.append(item_widget)
         self.downloads_layout.insertWidget(0, item_widget)
 
+class LazyTab(QWidget):
+    """Placeholder for a restored tab that has no QWebEngineView yet; state is its session journal entry."""
+    def __init__(self, state, parent=None):
+        super().__init__(parent)
+        self.state = state
+        layout = QVBoxLayout(self)
+        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(QLabel(state.get("url", "")))
+
+
 class DoorsBrowser(QMainWindow):
     """
     The main browser window class.
@@ -873,7 +1690,7 @@ class DoorsBrowser(QMainWindow):
     """
     def __init__(self):
         super().__init__()
-        self.data_manager = DataManager()
+        self.data_manager = WriteBehindDataManager(DataManager()) # save_* calls are written on a background thread
         self.data_manager.initialize_project_structure() # Ensure data structure exists
 
         self.setWindowTitle(APP_NAME)
@@ -892,8 +1709,22 @@ class DoorsBrowser(QMainWindow):
 
         # Load initial data
         initial_data = self.data_manager.load_data()
-        self.history = initial_data["history"]
-        self.bookmarks = initial_data["bookmarks"]
+        self.history_store = HistoryStore(os.path.join(DATA_DIR, "history.sqlite"))
+        self.page_text_indexer = PageTextIndexer(self.history_store.path, self)
+        self.history_dialog = None
+        self.import_json_history(initial_data["history"])
+        self.last_history_url = None
+        self.bookmarks = BookmarkStore(initial_data["bookmarks"])
+        self.bookmark_file_threads = []
+        self.suggestion_index = SuggestionIndex() # Shared by the address bar and the home page
+        self.suggestion_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="suggestions")
+        self.load_suggestion_index()
+        # Network fetches get their own single thread so slow requests never hold up the local sources
+        self.remote_suggestion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="remote-suggestions")
+        self.suggestion_sources = [KeywordSource(), OpenTabsSource(),
+                                   IndexSource("history", self.suggestion_index, "history"),
+                                   IndexSource("bookmarks", self.suggestion_index, "bookmarks"),
+                                   RemoteSource(executor=self.remote_suggestion_executor)]
         self.content = initial_data["content"] # Not used in this snippet, but kept for consistency
         self.settings = initial_data["settings"]
         self.site_permissions = initial_data["site_permissions"]
@@ -913,7 +1744,21 @@ class DoorsBrowser(QMainWindow):
 
         self.custom_tab_buttons_map = {}
         self.tab_last_active_time = {}
-        self.suspended_tabs_data = {}
+        self.tab_dirty_forms = {} # {web_view: bool}, last result of the unsaved form probe
+        self.session_journal = SessionJournal(os.path.join(DATA_DIR, "session.journal"),
+                                              os.path.join(DATA_DIR, "session.previous.journal"))
+        self.session_tab_ids = {} # {web_view: tab id in the session journal}
+        self.session_tab_counter = itertools.count(1)
+        self.session_dirty_tabs = set()
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(SESSION_WRITE_DELAY)
+        self.session_timer.timeout.connect(self.flush_session)
+        self.closed_tabs = ClosedTabStack(os.path.join(CACHE_DIR, "closed_tabs"))
+        self.lazy_preload_queue = [] # LazyTabs to materialize in the background, most recently used first
+        self.lazy_preload_timer = QTimer(self)
+        self.lazy_preload_timer.setInterval(LAZY_TAB_PRELOAD_INTERVAL)
+        self.lazy_preload_timer.timeout.connect(self.preload_next_lazy_tab)
         self.devtools_windows = []
 
         self.downloads_dialog = DownloadsDialog(self)
@@ -924,11 +1769,16 @@ class DoorsBrowser(QMainWindow):
         self._apply_initial_settings(self.settings)
         self.setup_shortcuts()
 
-        # Timer for suspending inactive tabs
+        # Timer for freezing and discarding inactive tabs
         self.suspend_timer = QTimer(self)
         self.suspend_timer.timeout.connect(self.check_and_suspend_inactive_tabs)
         self.suspend_timer.start(SUSPEND_CHECK_INTERVAL)
 
+        # Timer for discarding tabs when renderers exceed the memory budget
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(self.check_memory_pressure)
+        self.memory_timer.start(MEMORY_CHECK_INTERVAL)
+
         # Load initial tab based on startup behavior
         startup_behavior = self.settings.get("startup_behavior", "Open Homepage")
         if startup_behavior == "Open New Tab":
@@ -1199,24 +2049,46 @@ class DoorsBrowser(QMainWindow):
         main_layout.addWidget(self.tab_widget)
 
         # Initialize HomePage instance
-        self.home_page = HomePage(self.history, self.bookmarks)
+        self.home_page = HomePage()
+        self.home_page.completer = self.create_suggestion_completer(self.home_page.search_bar)
         self.home_page.search_triggered.connect(self.handle_search)
 
     def setup_completer(self):
-        """Sets up the completer for the address bar based on history and bookmarks."""
-        suggestions = list(set([entry["url"] for entry in self.history] +
-                               [entry["url"] for entry in self.bookmarks] +
-                               ["Search Google for...", "Wikipedia", "YouTube"]))
-        self.completer = QCompleter(suggestions, self)
-        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.address_bar.setCompleter(self.completer)
+        """Sets up asynchronous suggestions for the address bar."""
+        self.completer = self.create_suggestion_completer(self.address_bar)
+
+    def create_suggestion_completer(self, line_edit):
+        return SuggestionCompleter(self.suggestion_sources, self.suggestion_executor, line_edit, self.suggestion_context)
+
+    def suggestion_context(self):
+        """Snapshot of GUI state for the suggestion sources, which run on worker threads."""
+        tabs = []
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if isinstance(widget, QWebEngineView):
+                tabs.append((widget.url().toString(), self.tab_widget.tabText(i)))
+        search_engine = self.settings.get("default_search_engine", "yahoo")
+        return {
+            "tabs": tabs,
+            "search_url": SEARCH_ENGINE_URLS.get(search_engine, SEARCH_ENGINE_URLS["yahoo"]),
+            "suggest_url": self.settings.get("search_suggestions_url", "")
+        }
+
+    def load_suggestion_index(self):
+        """
+        Rebuilds the suggestion index from the history database and bookmarks (startup and bulk changes only).
+        The rows are read here, so visits recorded afterwards are not counted twice; tokenizing and sorting
+        run on suggestion_executor and the result is swapped in when done.
+        """
+        self.suggestion_executor.submit(self.suggestion_index.rebuild,
+                                        self.history_store.top_urls(SUGGESTION_HISTORY_LIMIT), list(self.bookmarks))
 
     def setup_shortcuts(self):
         """Sets up global keyboard shortcuts for browser actions."""
         QShortcut(QKeySequence("Ctrl+T"), self, lambda: self.add_new_tab())
         QShortcut(QKeySequence("Ctrl+W"), self, lambda: self.close_tab(self.tab_widget.currentIndex()))
         QShortcut(QKeySequence("Ctrl+R"), self, self.refresh_current_tab)
-        QShortcut(QKeySequence("Ctrl+H"), self, self.show_history)
+        QShortcut(QKeySequence("Ctrl+H"), self, self.show_history_dialog)
         QShortcut(QKeySequence("Ctrl+B"), self, self.show_bookmarks_menu)
         QShortcut(QKeySequence("F11"), self, self.toggle_fullscreen)
         QShortcut(QKeySequence("Ctrl+L"), self, self.address_bar.setFocus)
@@ -1224,27 +2096,42 @@ class DoorsBrowser(QMainWindow):
         QShortcut(QKeySequence("Ctrl+Shift+S"), self, self.suspend_current_tab_manual)
 
     def reopen_last_closed_tab(self):
-        """Reopens the last closed tab (basic implementation, could be improved)."""
-        QMessageBox.information(self, "Feature In Progress", "Reopening last closed tab is not yet implemented.")
+        """Reopens the most recently closed tab at its old position with its back/forward history and zoom."""
+        entry = self.closed_tabs.pop()
+        if entry is None:
+            QMessageBox.information(self, "Reopen Closed Tab", "There are no recently closed tabs.")
+            return
+        if self.add_new_tab(entry["url"], history_data=entry["history"], zoom_factor=entry["zoom"], position=entry["position"]) is None:
+            # Tab limit reached (add_new_tab warned); keep the entry so it can be reopened later
+            self.closed_tabs.push(entry["url"], entry["title"], entry["position"], entry["zoom"], entry["history"])
 
     def suspend_current_tab_manual(self):
-        """Suspends the currently active tab manually."""
+        """
+        Discards the current tab to save memory. A visible page cannot be discarded, so this
+        switches to a neighbouring tab first; the tab reloads from its history when activated again.
+        """
         current_index = self.tab_widget.currentIndex()
         if current_index == -1: return
-        
+
         current_widget = self.tab_widget.widget(current_index)
-        if isinstance(current_widget, QWebEngineView):
-            if current_widget == self.home_page:
-                QMessageBox.warning(self, "Suspend Tab", "Cannot suspend the Home tab.")
-                return
-            if current_widget in self.suspended_tabs_data:
-                QMessageBox.information(self, "Suspend Tab", "This tab is already suspended.")
-                return
-            
-            self.suspend_tab(current_index, current_widget)
-            QMessageBox.information(self, "Suspend Tab", "Current tab suspended to save memory.")
-        else:
+        if not isinstance(current_widget, QWebEngineView):
             QMessageBox.warning(self, "Suspend Tab", "Only web pages can be suspended.")
+            return
+        if self.tab_widget.count() <= 1:
+            QMessageBox.information(self, "Suspend Tab", "Open another tab before suspending this one.")
+            return
+
+        self.tab_widget.setCurrentIndex(current_index + 1 if current_index + 1 < self.tab_widget.count() else current_index - 1)
+        # Visibility changes are applied asynchronously, so change the state on the next event loop pass
+        QTimer.singleShot(0, lambda: self.discard_suspended_tab(current_widget))
+
+    def discard_suspended_tab(self, web_view):
+        """Second half of suspend_current_tab_manual, run once the tab has been switched away from."""
+        if web_view not in self.tab_last_active_time or self.tab_widget.indexOf(web_view) == -1:
+            return # Closed in the meantime
+        if not self.discard_tab(web_view):
+            QMessageBox.information(self, "Suspend Tab",
+                                    "This tab cannot be suspended right now (it may be playing audio or have DevTools open).")
 
     def get_current_web_view(self):
         """Returns the QWebEngineView of the currently active tab, or None."""
@@ -1308,22 +2195,23 @@ def go_to_homepage(self):
             self.add_new_tab(url=homepage_url_setting)
 
 
-    def add_new_tab(self, url="", is_home=False):
+    def add_new_tab(self, url="", is_home=False, history_data=None, zoom_factor=1.0, position=None):
         """
-        Adds a new tab to the browser.
+        Adds a new tab to the browser and returns its widget (None if the tab limit is reached).
         If is_home is True, adds the HomePage widget.
         Otherwise, adds a QWebEngineView and loads the specified URL or a default.
+        history_data (from serialize_page_history) restores a tab's back/forward history instead.
+        position inserts the tab at that index instead of appending it.
         """
         max_tabs = self.settings.get("max_tabs", 30)
         
         current_dynamic_tabs = self.tab_widget.count() - (1 if self.tab_widget.indexOf(self.home_page) != -1 else 0)
         if not is_home and current_dynamic_tabs >= max_tabs:
             QMessageBox.warning(self, "Warning", f"Maximum number of tabs ({max_tabs}) reached!")
-            return
+            return None
 
         widget = None
         tab_title = "New Tab"
-        suspended_data = None
 
         if is_home:
             # This block is specifically for the internal HomePage widget
@@ -1331,61 +2219,14 @@ def go_to_homepage(self):
             # This ensures it's always the HomePage widget, not a QWebEngineView loading "about:home"
             widget = self.home_page
             tab_title = "Home"
-            self.home_page.history = self.history
-            self.home_page.bookmarks = self.bookmarks
-            self.home_page.setup_completer()
-        elif url.startswith("about:suspended_"):
-            placeholder_id_str = url.split("about:suspended_")[1]
-            found_placeholder = None
-            for ph_widget, data in self.suspended_tabs_data.items():
-                if str(id(ph_widget)) == placeholder_id_str:
-                    found_placeholder = ph_widget
-                    suspended_data = data
-                    break
-            
-            if suspended_data and found_placeholder:
-                url = suspended_data['url']
-                tab_title = suspended_data['title']
-                original_index = self.tab_widget.indexOf(found_placeholder)
-                if original_index != -1:
-                    self.tab_widget.removeTab(original_index)
-                    self.custom_tab_buttons_map.pop(found_placeholder, None)
-                    found_placeholder.deleteLater()
-                self.suspended_tabs_data.pop(found_placeholder, None)
-            else:
-                url = "about:blank"
-
-        if not widget: # If not a special home page or suspended page, create a QWebEngineView
-            web_view = QWebEngineView()
-            page = QWebEnginePage(self.profile, web_view)
-            page.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-            page.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
-            web_view.setPage(page)
-            web_view.setCursor(Qt.CursorShape.ArrowCursor)
-
-            page.featurePermissionRequested.connect(self.handle_feature_permission_request)
-
-            web_view.titleChanged.connect(lambda title: self.update_tab_title(web_view, title))
-            web_view.urlChanged.connect(lambda url: self.update_address_bar_and_history(web_view, url))
-            web_view.loadStarted.connect(self.show_progress)
-            web_view.loadProgress.connect(self.update_progress)
-            web_view.loadFinished.connect(lambda ok: self.hide_progress_and_handle_error(ok, web_view))
-            web_view.page().linkHovered.connect(self.show_link_status)
-            web_view.page().fullScreenRequested.connect(self.handle_fullscreen_request)
-            
-            web_view.page().loadFinished.connect(lambda ok: self.extension_manager.apply_content_scripts(web_view.page()))
 
-            if not url:
-                url = "about:blank"
-            if not (url.startswith('http://') or url.startswith('https://') or url.startswith('about:')):
-                url = 'https://' + url
-            web_view.load(QUrl(url))
-            widget = web_view
-            if not is_home and not suspended_data:
-                tab_title = "New Tab"
+        if not widget: # If not the home page, create a QWebEngineView
+            widget = self.create_web_view(url, history_data, zoom_factor)
 
         if is_home:
             index = self.tab_widget.insertTab(0, widget, tab_title)
+        elif position is not None:
+            index = self.tab_widget.insertTab(max(position, 1 if self.tab_widget.indexOf(self.home_page) == 0 else 0), widget, tab_title)
         else:
             index = self.tab_widget.addTab(widget, tab_title)
 
@@ -1395,6 +2236,114 @@ def go_to_homepage(self):
         self.update_tab_bar_scroll()
         self.update_tab_counter()
         self.tab_last_active_time[widget] = datetime.now()
+        return widget
+
+    def create_web_view(self, url, history_data=None, zoom_factor=1.0):
+        """Creates a tab's QWebEngineView on the browser profile and starts loading url or the restored history."""
+        web_view = QWebEngineView()
+        page = QWebEnginePage(self.profile, web_view)
+        page.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
+        page.settings().setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+        web_view.setPage(page)
+        web_view.setCursor(Qt.CursorShape.ArrowCursor)
+
+        page.featurePermissionRequested.connect(self.handle_feature_permission_request)
+
+        web_view.titleChanged.connect(lambda title: self.update_tab_title(web_view, title))
+        web_view.urlChanged.connect(lambda url: self.update_address_bar_and_history(web_view, url))
+        web_view.loadStarted.connect(self.show_progress)
+        web_view.loadProgress.connect(self.update_progress)
+        web_view.loadFinished.connect(lambda ok: self.hide_progress_and_handle_error(ok, web_view))
+        web_view.loadFinished.connect(lambda ok: self.index_page_text(ok, web_view))
+        web_view.page().linkHovered.connect(self.show_link_status)
+        web_view.page().fullScreenRequested.connect(self.handle_fullscreen_request)
+        page.lifecycleStateChanged.connect(lambda state: self.update_tab_lifecycle_indicator(web_view, state))
+        web_view.urlChanged.connect(lambda url: self.schedule_session_update(web_view))
+        web_view.titleChanged.connect(lambda title: self.schedule_session_update(web_view))
+        web_view.loadFinished.connect(lambda ok: self.schedule_session_update(web_view))
+
+        if not url:
+            url = "about:blank"
+        if not (url.startswith('http://') or url.startswith('https://') or url.startswith('about:')):
+            url = 'https://' + url
+        if history_data:
+            restore_page_history(page, history_data)
+        else:
+            web_view.load(QUrl(url))
+        if zoom_factor != 1.0:
+            web_view.setZoomFactor(zoom_factor)
+        self.schedule_session_update(web_view)
+        return web_view
+
+    def add_lazy_tab(self, state):
+        """
+        Adds a restored tab without a view or renderer: only its tab button and a placeholder.
+        The view is created when the tab is activated or preloaded (see materialize_lazy_tab).
+        """
+        title = state.get("title") or state.get("url") or "New Tab"
+        placeholder = LazyTab(state)
+        index = self.tab_widget.addTab(placeholder, title[:20])
+        self.create_custom_tab_button(placeholder, title[:20], index)
+        custom_button_container = self.custom_tab_buttons_map.get(placeholder)
+        if custom_button_container:
+            custom_button_container.setToolTip(title)
+        self.tab_last_active_time[placeholder] = datetime.now()
+        self.schedule_session_update(placeholder)
+        return placeholder
+
+    def materialize_lazy_tab(self, placeholder, activate=True):
+        """Replaces a LazyTab with a real QWebEngineView at the same position, keeping its tab button and session id."""
+        index = self.tab_widget.indexOf(placeholder)
+        if index == -1:
+            return None
+        state = placeholder.state
+        try:
+            history_data = base64.b64decode(state.get("history", ""), validate=True)
+        except (binascii.Error, ValueError):
+            history_data = None
+        web_view = self.create_web_view(state.get("url", ""), history_data, state.get("zoom", 1.0))
+
+        was_current = self.tab_widget.currentIndex() == index
+        self.tab_widget.blockSignals(True) # Swap without activate_tab seeing the intermediate states
+        self.tab_widget.insertTab(index, web_view, self.tab_widget.tabText(index))
+        self.tab_widget.removeTab(index + 1)
+        if was_current:
+            self.tab_widget.setCurrentIndex(index)
+        self.tab_widget.blockSignals(False)
+
+        for mapping in (self.custom_tab_buttons_map, self.tab_last_active_time, self.session_tab_ids):
+            if placeholder in mapping:
+                mapping[web_view] = mapping.pop(placeholder)
+        self.session_dirty_tabs.discard(placeholder)
+        self.unqueue_lazy_tab(placeholder)
+        placeholder.deleteLater()
+        if was_current and activate:
+            self.activate_tab(index)
+        return web_view
+
+    def unqueue_lazy_tab(self, placeholder):
+        """Drops a LazyTab that is being replaced or closed from the preload queue (it is deleted afterwards)."""
+        if placeholder in self.lazy_preload_queue:
+            self.lazy_preload_queue.remove(placeholder)
+            if not self.lazy_preload_queue:
+                self.lazy_preload_timer.stop()
+
+    def preload_next_lazy_tab(self):
+        """Materializes one queued restored tab in the background."""
+        while self.lazy_preload_queue:
+            placeholder = self.lazy_preload_queue.pop(0)
+            if self.tab_widget.indexOf(placeholder) != -1:
+                self.materialize_lazy_tab(placeholder, activate=False)
+                break
+        if not self.lazy_preload_queue:
+            self.lazy_preload_timer.stop()
+
+    def tab_index_of_button(self, button_container):
+        """Current tab index of the tab owning a custom tab button, or -1."""
+        for widget, container in self.custom_tab_buttons_map.items():
+            if container is button_container:
+                return self.tab_widget.indexOf(widget)
+        return -1
 
     def create_custom_tab_button(self, widget, title, index):
         """Creates a custom tab button (QWidget with QPushButton and QToolButton) for the given widget."""
@@ -1407,14 +2356,15 @@ def go_to_homepage(self):
         tab_button = QPushButton(title)
         tab_button.setToolTip(title)
         tab_button.setFlat(True)
-        tab_button.clicked.connect(lambda: self.switch_to_custom_tab(index))
+        # Look the index up on click: it changes when tabs before this one are closed or inserted
+        tab_button.clicked.connect(lambda: self.switch_to_custom_tab(self.tab_index_of_button(tab_button_container)))
         tab_button_layout.addWidget(tab_button)
 
         if widget != self.home_page:
             close_button = QToolButton()
             close_button.setIcon(QIcon(find_icon("close")))
             close_button.setFixedSize(20, 20)
-            close_button.clicked.connect(lambda: self.close_tab(index))
+            close_button.clicked.connect(lambda: self.close_tab(self.tab_index_of_button(tab_button_container)))
             tab_button_layout.addWidget(close_button)
 
         tab_button_container.setFixedSize(TAB_BUTTON_WIDTH, TAB_BUTTON_HEIGHT)
@@ -1424,7 +2374,10 @@ def go_to_homepage(self):
             self.home_tab_button.setToolTip(title)
             self.custom_tab_buttons_map[widget] = self.home_tab_button
         else:
-            self.tab_bar_layout.addWidget(tab_button_container)
+            layout_index = self.tab_widget.indexOf(widget)
+            if self.tab_widget.indexOf(self.home_page) != -1:
+                layout_index -= 1 # The home tab uses home_tab_button, outside tab_bar_layout
+            self.tab_bar_layout.insertWidget(layout_index, tab_button_container)
             self.custom_tab_buttons_map[widget] = tab_button_container
         
         self.update_tab_bar_scroll()
@@ -1476,6 +2429,9 @@ def go_to_homepage(self):
             return
 
         current_widget = self.tab_widget.widget(index)
+        if isinstance(current_widget, LazyTab):
+            self.materialize_lazy_tab(current_widget) # Calls activate_tab again for the new view
+            return
         if current_widget:
             self.tab_last_active_time[current_widget] = datetime.now()
 
@@ -1496,6 +2452,7 @@ def go_to_homepage(self):
                         scroll_bar.setValue(tab_x + tab_width - scroll_view_width)
 
             if isinstance(current_widget, QWebEngineView):
+                self.set_tab_lifecycle_state(current_widget, QWebEnginePage.LifecycleState.Active)
                 self.address_bar.setText(current_widget.url().toString())
                 self.back_btn.setEnabled(current_widget.page().history().canGoBack())
                 self.forward_btn.setEnabled(current_widget.page().history().canGoForward())
@@ -1513,6 +2470,7 @@ def go_to_homepage(self):
                     self.toggle_reading_mode(force_off=True)
 
         self.update_tab_counter()
+        self.schedule_session_update()
 
     def close_tab(self, index):
         """Closes the tab at the given index and cleans up the widget and custom button."""
@@ -1530,8 +2488,14 @@ def go_to_homepage(self):
         """Internal method to perform the tab closing."""
         widget_to_close = self.tab_widget.widget(index)
         if widget_to_close:
+            self.remember_closed_tab(widget_to_close, index)
             self.tab_last_active_time.pop(widget_to_close, None)
-            self.suspended_tabs_data.pop(widget_to_close, None)
+            self.tab_dirty_forms.pop(widget_to_close, None)
+            self.session_dirty_tabs.discard(widget_to_close)
+            self.unqueue_lazy_tab(widget_to_close)
+            session_tab_id = self.session_tab_ids.pop(widget_to_close, None)
+            if session_tab_id is not None:
+                self.session_journal.remove_tab(session_tab_id)
 
             custom_button_container = self.custom_tab_buttons_map.pop(widget_to_close, None)
             if custom_button_container:
@@ -1540,7 +2504,7 @@ def go_to_homepage(self):
 
             self.tab_widget.removeTab(index)
 
-            if isinstance(widget_to_close, QWebEngineView):
+            if isinstance(widget_to_close, (QWebEngineView, LazyTab)):
                 widget_to_close.setParent(None)
                 widget_to_close.deleteLater()
             elif isinstance(widget_to_close, HomePage):
@@ -1549,6 +2513,21 @@ def go_to_homepage(self):
             self.update_tab_bar_scroll()
             self.update_tab_counter()
 
+    def remember_closed_tab(self, widget, index):
+        """Pushes a closing tab with its serialized history onto the closed tab stack."""
+        if isinstance(widget, LazyTab):
+            state = widget.state
+            try:
+                history = base64.b64decode(state.get("history", ""), validate=True)
+            except (binascii.Error, ValueError):
+                history = b""
+            self.closed_tabs.push(state.get("url", ""), state.get("title", ""), index, state.get("zoom", 1.0), history)
+        elif isinstance(widget, QWebEngineView):
+            url = widget.url().toString()
+            if (not url or url == "about:blank") and not widget.page().history().canGoBack():
+                return
+            self.closed_tabs.push(url, widget.title(), index, widget.zoomFactor(), serialize_page_history(widget.page()))
+
     def update_tab_bar_scroll(self):
         """Adjusts the minimum width of the tab bar widget to enable/disable scrolling."""
         num_dynamic_tabs = self.tab_widget.count() - (1 if self.tab_widget.indexOf(self.home_page) != -1 else 0)
@@ -1597,12 +2576,9 @@ def go_to_homepage(self):
         search_engine = self.settings.get("default_search_engine", "yahoo")
         base_search_url = SEARCH_ENGINE_URLS.get(search_engine, SEARCH_ENGINE_URLS["yahoo"])
 
-        if url_or_query.lower().startswith("wikipedia"):
-            query = url_or_query.replace("wikipedia", "").strip()
-            self.add_new_tab(f"https://en.wikipedia.org/wiki/{query.replace(' ', '_')}")
-        elif url_or_query.lower().startswith("youtube"):
-            query = url_or_query.replace("youtube", "").strip()
-            self.add_new_tab(f"https://www.youtube.com/results?search_query={query.replace(' ', '+')}")
+        search_keyword_url = keyword_url(url_or_query)
+        if search_keyword_url:
+            self.add_new_tab(search_keyword_url)
         elif url_or_query.lower() == "about:home":
             self.go_to_homepage() # Use the dedicated method
         else:
@@ -1629,24 +2605,32 @@ def go_to_homepage(self):
     def add_to_history(self, url):
         """Adds the given URL to the browser's history."""
         url_str = url.toString()
-        if not url_str or url_str == "about:blank" or url_str == "https://www.example.com/" or url_str.startswith("about:error") or url_str.startswith("about:suspended"):
+        if not url_str or url_str == "about:blank" or url_str == "https://www.example.com/" or url_str.startswith("about:error"):
             return
 
-        if self.history and self.history[-1]["url"] == url_str:
+        if url_str == self.last_history_url:
             return
+        self.last_history_url = url_str
 
-        entry = {
-            "url": url_str,
-            "title": self.tab_widget.tabText(self.tab_widget.currentIndex()),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        self.history.append(entry)
-        if len(self.history) > 1000:
-            self.history = self.history[-1000:]
-        self.data_manager.save_history(self.history)
-        self.home_page.history = self.history
-        self.home_page.setup_completer()
-        self.setup_completer()
+        title = self.tab_widget.tabText(self.tab_widget.currentIndex())
+        self.history_store.add_visit(url_str, title)
+        self.suggestion_index.add_visit(url_str, title)
+
+    def index_page_text(self, ok, web_view):
+        """Queues the loaded page's text for history search when enabled in the privacy settings."""
+        if ok and self.settings.get("index_page_text", False):
+            self.page_text_indexer.schedule(web_view.page())
+
+    def import_json_history(self, entries):
+        """Moves history entries from DataManager's JSON file (legacy or cloud-synced) into the history database."""
+        if entries:
+            self.history_store.import_entries(entries)
+            self.data_manager.save_history([])
+
+    def sync_data_to_cloud(self):
+        """Exports recent history for DataManager and uploads browser data to the cloud."""
+        self.data_manager.save_history(list(reversed(self.history_store.recent_visits(HISTORY_SYNC_LIMIT))))
+        self.data_manager.sync_data_to_cloud()
 
     def show_progress(self):
         """Shows the progress bar."""
@@ -1681,13 +2665,9 @@ def go_to_homepage(self):
         if current_web_view:
             url = current_web_view.url().toString()
             title = self.tab_widget.tabText(self.tab_widget.currentIndex())
-            entry = {"url": url, "title": title}
-            if entry not in self.bookmarks:
-                self.bookmarks.append(entry)
-                self.data_manager.save_bookmarks(self.bookmarks)
-                self.home_page.bookmarks = self.bookmarks
-                self.home_page.setup_completer()
-                self.setup_completer()
+            if self.bookmarks.add(url, title):
+                self.data_manager.save_bookmarks(self.bookmarks.to_list())
+                self.suggestion_index.add_bookmark(url, title)
                 self.update_bookmarks_list()
                 QMessageBox.information(self, "Bookmark", f"Page '{title}' added to bookmarks.")
             else:
@@ -1697,11 +2677,24 @@ def go_to_homepage(self):
 
     def update_bookmarks_list(self):
         """Updates the bookmarks list in the sidebar."""
+        self.bookmarks_list.setUpdatesEnabled(False)
         self.bookmarks_list.clear()
         for bookmark in self.bookmarks:
             item = QListWidgetItem(bookmark["title"])
             item.setData(Qt.ItemDataRole.UserRole, bookmark["url"])
+            if bookmark.get("folder"):
+                item.setToolTip(" / ".join(bookmark["folder"]))
             self.bookmarks_list.addItem(item)
+        self.bookmarks_list.setUpdatesEnabled(True)
+
+    def add_bookmarks_batch(self, entries):
+        """Adds imported bookmarks with a single save and UI refresh. Returns how many were new."""
+        added = self.bookmarks.add_many(entries)
+        if added:
+            self.data_manager.save_bookmarks(self.bookmarks.to_list())
+            self.suggestion_index.add_bookmarks(added)
+            self.update_bookmarks_list()
+        return len(added)
 
     def load_url_from_bookmark_item(self, item):
         """Loads the URL from a clicked bookmark item in a new tab."""
@@ -1714,10 +2707,15 @@ def go_to_homepage(self):
         if not self.bookmarks:
             menu.addAction("No bookmarks available.").setEnabled(False)
         else:
+            folder_menus = {(): menu}
             for entry in reversed(self.bookmarks): # Show newest first
+                folder = tuple(entry.get("folder", ()))
+                for depth in range(1, len(folder) + 1):
+                    if folder[:depth] not in folder_menus:
+                        folder_menus[folder[:depth]] = folder_menus[folder[:depth - 1]].addMenu(folder[depth - 1])
                 action = QAction(entry["title"], self)
                 action.triggered.connect(lambda checked, url=entry["url"]: self.add_new_tab(url))
-                menu.addAction(action)
+                folder_menus[folder].addAction(action)
         menu.exec(self.bookmarks_menu_btn.mapToGlobal(self.bookmarks_menu_btn.rect().bottomLeft()))
 
     def show_settings(self):
@@ -1727,13 +2725,14 @@ def go_to_homepage(self):
         self.settings_dialog.clear_history_requested.connect(self.clear_history)
         self.settings_dialog.clear_cache_requested.connect(self.clear_cache)
         self.settings_dialog.clear_cookies_requested.connect(self.clear_cookies)
-        self.settings_dialog.sync_upload_requested.connect(self.data_manager.sync_data_to_cloud)
+        self.settings_dialog.sync_upload_requested.connect(self.sync_data_to_cloud)
         self.settings_dialog.sync_download_requested.connect(self.sync_data_from_cloud_and_reload)
         self.settings_dialog.bookmark_import_json_requested.connect(self.import_bookmarks_json)
         self.settings_dialog.bookmark_export_json_requested.connect(self.export_bookmarks_json)
         self.settings_dialog.bookmark_import_html_requested.connect(self.import_bookmarks_html)
         self.settings_dialog.bookmark_export_html_requested.connect(self.export_bookmarks_html)
         self.settings_dialog.manage_site_permissions_requested.connect(self.show_site_permissions_manager)
+        self.settings_dialog.adblock_diagnostics_requested.connect(self.show_adblock_diagnostics)
         # Connect accepted signal to show success message
         self.settings_dialog.accepted.connect(lambda: QMessageBox.information(self, "Settings", "Settings saved successfully."))
         self.settings_dialog.exec()
@@ -1751,6 +2750,8 @@ def go_to_homepage(self):
         self.adblock_interceptor.set_adblock_enabled(self.settings.get("adblock_enabled", True))
         self.adblock_interceptor.set_block_third_party_cookies(self.settings.get("block_third_party_cookies", False))
         self.adblock_interceptor.set_send_dnt_header(self.settings.get("send_dnt_header", False))
+        self.adblock_interceptor.set_send_gpc_header(self.settings.get("send_gpc_header", False))
+        self.apply_privacy_signals()
 
         self.default_download_path = self.settings.get("download_path", QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DownloadLocation))
 
@@ -1771,6 +2772,8 @@ def go_to_homepage(self):
         self.adblock_interceptor.set_adblock_enabled(self.settings.get("adblock_enabled", True))
         self.adblock_interceptor.set_block_third_party_cookies(self.settings.get("block_third_party_cookies", False))
         self.adblock_interceptor.set_send_dnt_header(self.settings.get("send_dnt_header", False))
+        self.adblock_interceptor.set_send_gpc_header(self.settings.get("send_gpc_header", False))
+        self.apply_privacy_signals()
 
         self.default_download_path = self.settings.get("download_path", QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DownloadLocation))
 
@@ -1779,11 +2782,11 @@ def go_to_homepage(self):
         self.apply_preferred_web_languages(self.settings.get("preferred_web_languages", "en-US,en;q=0.9"))
 
     def clear_history(self):
-        self.history = []
-        self.data_manager.save_history(self.history)
-        self.home_page.history = self.history
-        self.home_page.setup_completer()
-        self.setup_completer()
+        self.history_store.clear()
+        self.last_history_url = None
+        self.data_manager.save_history([])
+        self.suggestion_index.clear() # Cleared history must not be suggested until the rebuild is done
+        self.load_suggestion_index()
         QMessageBox.information(self, "History", "Browser history cleared.")
 
     def clear_cache(self):
@@ -1794,6 +2797,29 @@ def go_to_homepage(self):
         self.profile.cookieStore().deleteAllCookies()
         QMessageBox.information(self, "Cookies", "Browser cookies cleared.")
 
+    def apply_privacy_signals(self):
+        """
+        Exposes the enabled privacy signals to page scripts (navigator.doNotTrack and
+        navigator.globalPrivacyControl) through one profile-wide script, matching the headers.
+        """
+        scripts = self.profile.scripts()
+        for script in scripts.find("doors-privacy-signals"):
+            scripts.remove(script)
+
+        source_code = ""
+        if self.settings.get("send_dnt_header", False):
+            source_code += "Object.defineProperty(Navigator.prototype, 'doNotTrack', {get: () => '1', configurable: true});\n"
+        if self.settings.get("send_gpc_header", False):
+            source_code += "Object.defineProperty(Navigator.prototype, 'globalPrivacyControl', {get: () => true, configurable: true});\n"
+        if source_code:
+            script = QWebEngineScript()
+            script.setName("doors-privacy-signals")
+            script.setSourceCode(source_code)
+            script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+            script.setRunsOnSubFrames(True)
+            script.setWorldId(QWebEngineScript.ScriptWorldId.MainWorld)
+            scripts.insert(script)
+
     def apply_font_settings(self, font_family, font_size):
         """Applies default font family and size to QWebEngineSettings."""
         web_settings = self.profile.settings()
@@ -1809,13 +2835,86 @@ def go_to_homepage(self):
         self.profile.setHttpAcceptLanguage(languages_string)
         print(f"Preferred web languages set to: {languages_string}")
 
+    def show_adblock_diagnostics(self):
+        stats_dialog = AdBlockStatsDialog(self.adblock_interceptor, self)
+        stats_dialog.exec()
+
     def show_site_permissions_manager(self):
         site_perm_dialog = SitePermissionsDialog(self.data_manager, self)
         site_perm_dialog.exec()
         self.site_permissions = self.data_manager.load_data()["site_permissions"]
 
+    def schedule_session_update(self, web_view=None):
+        """Marks a tab (or only the tab order and active tab) for the next session journal write."""
+        if web_view is not None:
+            self.session_dirty_tabs.add(web_view)
+        if not self.session_timer.isActive():
+            self.session_timer.start()
+
+    def flush_session(self):
+        """Appends changed tabs, the tab order and the active tab to the session journal."""
+        self.session_timer.stop()
+        for widget in self.session_dirty_tabs:
+            if self.tab_widget.indexOf(widget) == -1:
+                continue
+            tab_id = self.session_tab_ids.get(widget)
+            if tab_id is None:
+                tab_id = self.session_tab_ids[widget] = next(self.session_tab_counter)
+            if isinstance(widget, LazyTab):
+                self.session_journal.update_tab(tab_id, widget.state)
+                continue
+            last_active = self.tab_last_active_time.get(widget)
+            self.session_journal.update_tab(tab_id, {
+                "url": widget.url().toString(),
+                "title": widget.title(),
+                "zoom": widget.zoomFactor(),
+                "history": base64.b64encode(serialize_page_history(widget.page())).decode("ascii"),
+                "last_active": last_active.timestamp() if last_active else 0
+            })
+        self.session_dirty_tabs.clear()
+        order = []
+        for i in range(self.tab_widget.count()):
+            tab_id = self.session_tab_ids.get(self.tab_widget.widget(i))
+            if tab_id is not None:
+                order.append(tab_id)
+        self.session_journal.set_order(order)
+        self.session_journal.set_active(self.session_tab_ids.get(self.tab_widget.currentWidget()))
+
     def restore_last_session(self):
-        QMessageBox.information(self, "Restore Session", "Restoring last session is not yet implemented.")
+        """
+        Reopens the tabs of the previous run (after a normal exit or a crash) with their history and zoom.
+        Tabs are restored as LazyTabs, so startup cost does not grow with the session size.
+        """
+        tabs, active_id = SessionJournal.load(os.path.join(DATA_DIR, "session.previous.journal"))
+        if not tabs:
+            QMessageBox.information(self, "Restore Session", "There is no previous session to restore.")
+            if self.tab_widget.count() == 0:
+                self.go_to_homepage()
+            return
+        active_widget = None
+        restored = []
+        self.tab_widget.blockSignals(True) # Adding tabs must not activate (and load) each of them
+        for tab_id, state in tabs:
+            if self.tab_widget.count() - (1 if self.tab_widget.indexOf(self.home_page) != -1 else 0) >= self.settings.get("max_tabs", 30):
+                QMessageBox.warning(self, "Restore Session", f"Only the first {len(restored)} tabs were restored (tab limit reached).")
+                break
+            placeholder = self.add_lazy_tab(state)
+            restored.append(placeholder)
+            if tab_id == active_id:
+                active_widget = placeholder
+        self.tab_widget.blockSignals(False)
+        if not restored:
+            return
+        # Only the active tab gets a view now; a few other recently used tabs are loaded in the background
+        self.tab_widget.setCurrentWidget(active_widget or restored[-1])
+        self.activate_tab(self.tab_widget.currentIndex())
+        self.update_tab_bar_scroll()
+        self.update_tab_counter()
+        pending = [placeholder for placeholder in restored if self.tab_widget.indexOf(placeholder) != -1]
+        pending.sort(key=lambda placeholder: placeholder.state.get("last_active", 0), reverse=True)
+        self.lazy_preload_queue = pending[:self.settings.get("preload_restored_tabs", 3)]
+        if self.lazy_preload_queue:
+            self.lazy_preload_timer.start()
 
     def import_bookmarks_json(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Import Bookmarks from JSON", "", "JSON Files (*.json)")
@@ -1824,18 +2923,9 @@ def go_to_homepage(self):
                 with open(file_path, "r", encoding="utf-8") as f:
                     imported_data = json.load(f)
                 if "entries" in imported_data and isinstance(imported_data["entries"], list):
-                    new_bookmarks = []
-                    for entry in imported_data["entries"]:
-                        if "url" in entry and "title" in entry:
-                            if {"url": entry["url"], "title": entry["title"]} not in self.bookmarks:
-                                new_bookmarks.append({"url": entry["url"], "title": entry["title"]})
-                    self.bookmarks.extend(new_bookmarks)
-                    self.data_manager.save_bookmarks(self.bookmarks)
-                    self.update_bookmarks_list()
-                    self.home_page.bookmarks = self.bookmarks
-                    self.home_page.setup_completer()
-                    self.setup_completer()
-                    QMessageBox.information(self, "Import Bookmarks", f"{len(new_bookmarks)} new bookmarks imported.")
+                    added = self.add_bookmarks_batch(entry for entry in imported_data["entries"]
+                                                     if isinstance(entry, dict) and "url" in entry and "title" in entry)
+                    QMessageBox.information(self, "Import Bookmarks", f"{added} new bookmarks imported.")
                 else:
                     QMessageBox.warning(self, "Error", "Invalid bookmark JSON file format.")
             except Exception as e:
@@ -1845,7 +2935,8 @@ def go_to_homepage(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Bookmarks to JSON", "bookmarks.json", "JSON Files (*.json)")
         if file_path:
             try:
-                self.data_manager.save_bookmarks(self.bookmarks) # Ensure latest data is saved
+                self.data_manager.save_bookmarks(self.bookmarks.to_list()) # Ensure latest data is saved
+                self.data_manager.flush()
                 shutil.copy(os.path.join(DATA_DIR, "bookmarks.json"), file_path)
                 QMessageBox.information(self, "Export Bookmarks", f"Bookmarks successfully exported to '{file_path}'.")
             except Exception as e:
@@ -1854,54 +2945,50 @@ def go_to_homepage(self):
     def import_bookmarks_html(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Import Bookmarks from HTML", "", "HTML Files (*.html *.htm)")
         if file_path:
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    html_content = f.read()
-                
-                new_bookmarks = []
-                pattern = re.compile(r'<A HREF="([^"]+)"[^>]*>(.*?)</A>', re.IGNORECASE | re.DOTALL)
-                for match in pattern.finditer(html_content):
-                    url = match.group(1)
-                    title = match.group(2).strip()
-                    title = re.sub(r'<[^>]+>', '', title)
-                    if url and title:
-                        if {"url": url, "title": title} not in self.bookmarks:
-                            new_bookmarks.append({"url": url, "title": title})
-
-                self.bookmarks.extend(new_bookmarks)
-                self.data_manager.save_bookmarks(self.bookmarks)
-                self.update_bookmarks_list()
-                self.home_page.bookmarks = self.bookmarks
-                self.home_page.setup_completer()
-                self.setup_completer()
-                QMessageBox.information(self, "Import Bookmarks", f"{len(new_bookmarks)} new bookmarks imported.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error importing bookmarks: {e}")
+            self.run_bookmark_file_task("Import Bookmarks", "Importing bookmarks...",
+                                        lambda progress, is_cancelled: list(iter_bookmarks_html(file_path, progress, is_cancelled)),
+                                        self._on_bookmarks_html_imported)
+
+    def _on_bookmarks_html_imported(self, entries):
+        added = self.add_bookmarks_batch(entries)
+        QMessageBox.information(self, "Import Bookmarks", f"{added} new bookmarks imported.")
 
     def export_bookmarks_html(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Bookmarks to HTML", "bookmarks.html", "HTML Files (*.html *.htm)")
         if file_path:
-            try:
-                html_content = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
-                <META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
-                <TITLE>Bookmarks</TITLE>
-                <H1>Bookmarks</H1>
-                <DL><p>
-                """
-                for bookmark in self.bookmarks:
-                    html_content += f'    <DT><A HREF="{bookmark["url"]}">{bookmark["title"]}</A>\n'
-                html_content += """</DL><p>"""
-
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(html_content)
-                QMessageBox.information(self, "Export Bookmarks", f"Bookmarks successfully exported to '{file_path}'.")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error exporting bookmarks: {e}")
+            entries = self.bookmarks.to_list()
+            self.run_bookmark_file_task("Export Bookmarks", "Exporting bookmarks...",
+                                        lambda progress, is_cancelled: write_bookmarks_html(file_path, entries, progress, is_cancelled),
+                                        lambda result: QMessageBox.information(self, "Export Bookmarks", f"Bookmarks successfully exported to '{file_path}'."))
+
+    def run_bookmark_file_task(self, title, label, task, on_success):
+        """Runs a bookmark file task on a BookmarkFileThread behind a cancellable progress dialog."""
+        progress_dialog = QProgressDialog(label, "Cancel", 0, 100, self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(300)
+        thread = BookmarkFileThread(task)
+        thread.progress_changed.connect(progress_dialog.setValue)
+        progress_dialog.canceled.connect(thread.requestInterruption)
+        thread.completed.connect(lambda ok, message: self._on_bookmark_file_task_finished(thread, progress_dialog, title, ok, message, on_success))
+        self.bookmark_file_threads.append(thread)
+        thread.start()
+
+    def _on_bookmark_file_task_finished(self, thread, progress_dialog, title, ok, message, on_success):
+        thread.wait()
+        self.bookmark_file_threads.remove(thread)
+        cancelled = progress_dialog.wasCanceled()
+        progress_dialog.reset()
+        if ok:
+            on_success(thread.result)
+        elif not cancelled:
+            QMessageBox.critical(self, "Error", f"{title} failed: {message}")
 
     def apply_theme(self, theme):
         """Applies the specified theme (light/dark) using QSS files."""
-        self.settings["theme"] = theme
-        self.data_manager.save_settings(self.settings) # Save theme setting
+        if self.settings.get("theme") != theme:
+            self.settings["theme"] = theme
+            self.data_manager.save_settings(self.settings) # Save theme setting
         style_path = os.path.join(STYLES_DIR, f"{theme}.qss")
         if os.path.exists(style_path):
             try:
@@ -2080,66 +3167,140 @@ def go_to_homepage(self):
             print(f"Permission request for {feature_name} from {origin} cancelled by user.")
 
     def check_and_suspend_inactive_tabs(self):
-        """Periodically checks for inactive tabs and suspends them."""
+        """
+        Periodically moves background tabs down the page lifecycle: Frozen after suspend_timeout_minutes
+        (no CPU, memory kept) and Discarded after discard_timeout_minutes (renderer freed, view,
+        history and tab button kept). activate_tab brings a tab back to Active.
+        """
         if not self.settings.get("suspend_inactive_tabs", True):
             return
 
-        suspend_timeout_seconds = self.settings.get("suspend_timeout_minutes", 5) * 60
+        freeze_seconds = self.settings.get("suspend_timeout_minutes", 5) * 60
+        discard_seconds = max(self.settings.get("discard_timeout_minutes", 30) * 60, freeze_seconds)
         current_time = datetime.now()
         current_active_widget = self.tab_widget.currentWidget()
 
-        widgets_to_suspend = []
         for i in range(self.tab_widget.count()):
             widget = self.tab_widget.widget(i)
-            if widget == current_active_widget or isinstance(widget, HomePage) or widget in self.suspended_tabs_data:
+            if widget == current_active_widget or not isinstance(widget, QWebEngineView):
+                continue
+            last_active = self.tab_last_active_time.get(widget)
+            if not last_active:
                 continue
+            idle_seconds = (current_time - last_active).total_seconds()
+            if idle_seconds > discard_seconds:
+                self.discard_tab(widget)
+            elif idle_seconds > freeze_seconds and widget.page().lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                # Frozen pages cannot run scripts, so record their form state for check_memory_pressure first
+                self.probe_dirty_forms(widget, lambda dirty, web_view=widget: self.set_tab_lifecycle_state(
+                    web_view, QWebEnginePage.LifecycleState.Frozen))
+
+    def check_memory_pressure(self):
+        """
+        Samples renderer RSS (via renderProcessPid) and system memory from /proc. When the renderers
+        exceed memory_budget_mb, or available memory drops below MIN_AVAILABLE_MEMORY_FRACTION,
+        background tabs are discarded least recently used first. Tabs that played audio recently or
+        may hold unsaved form input are kept; the form probe only runs on the tabs picked for discarding.
+        Tabs cannot be pinned yet, so there is nothing else to exempt.
+        """
+        if not self.settings.get("discard_on_memory_pressure", True):
+            return
+        system_memory = read_system_memory()
+        if system_memory is None:
+            return
+        total_memory, available_memory = system_memory
 
-            if isinstance(widget, QWebEngineView):
-                last_active = self.tab_last_active_time.get(widget)
-                if last_active and (current_time - last_active).total_seconds() > suspend_timeout_seconds:
-                    widgets_to_suspend.append((i, widget))
-
-        for index, web_view in widgets_to_suspend:
-            self.suspend_tab(index, web_view)
-
-    def suspend_tab(self, index, web_view):
-        """Suspends a QWebEngineView tab, replacing it with a placeholder."""
-        url = web_view.url().toString()
-        title = self.tab_widget.tabText(index)
-
-        placeholder_widget = QWidget()
-        placeholder_layout = QVBoxLayout(placeholder_widget)
-        placeholder_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        placeholder_layout.addWidget(QLabel("This tab is suspended to save memory."))
-        reload_btn = QPushButton("Reload")
-        suspended_url_key = f"about:suspended_{id(placeholder_widget)}"
-        reload_btn.clicked.connect(lambda: self.add_new_tab(url=suspended_url_key))
-        placeholder_layout.addWidget(reload_btn)
-        placeholder_widget.setStyleSheet("background-color: #f0f0f0; color: #555; border: 1px dashed #ccc;")
-        placeholder_widget.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-
-        self.suspended_tabs_data[placeholder_widget] = {
-            'url': url,
-            'title': title,
-            'original_index': index
-        }
+        current_widget = self.tab_widget.currentWidget()
+        process_rss = {}
+        process_tab_counts = {}
+        candidates = []
+        for i in range(self.tab_widget.count()):
+            widget = self.tab_widget.widget(i)
+            if not isinstance(widget, QWebEngineView):
+                continue
+            page = widget.page()
+            pid = page.renderProcessPid()
+            if not pid or page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+                continue
+            if pid not in process_rss:
+                process_rss[pid] = read_process_rss(pid) or 0
+            process_tab_counts[pid] = process_tab_counts.get(pid, 0) + 1
+            if widget == current_widget or page.recentlyAudible():
+                continue
+            # Frozen pages cannot run scripts, so only a clean result from before freezing lets them go
+            if page.lifecycleState() != QWebEnginePage.LifecycleState.Active and self.tab_dirty_forms.get(widget, True):
+                continue
+            candidates.append((widget, self.tab_last_active_time.get(widget, datetime.min), pid))
 
-        self.tab_widget.removeTab(index)
-        self.tab_widget.insertTab(index, placeholder_widget, title)
-        self.tab_widget.setTabText(index, f"Suspended: {title[:10]}...")
+        budget_mb = self.settings.get("memory_budget_mb", 0)
+        budget = budget_mb * 1024 * 1024 if budget_mb else total_memory // 2
+        to_free = bytes_over_budget(sum(process_rss.values()), budget, available_memory,
+                                    int(total_memory * MIN_AVAILABLE_MEMORY_FRACTION))
+        if not to_free:
+            return
+        # Only the selected tabs are probed, and only when memory has to be freed, so idle renderers stay asleep
+        for web_view in select_tabs_to_discard(candidates, process_rss, process_tab_counts, to_free):
+            if web_view.page().lifecycleState() == QWebEnginePage.LifecycleState.Active:
+                self.probe_dirty_forms(web_view, lambda dirty, web_view=web_view: dirty or self.discard_tab(web_view))
+            else:
+                self.discard_tab(web_view)
+        print(f"Memory pressure: renderers use {sum(process_rss.values()) // (1024 * 1024)} MB, "
+              f"{available_memory // (1024 * 1024)} MB available.")
 
-        old_custom_button = self.custom_tab_buttons_map.pop(web_view, None)
-        if old_custom_button:
-            self.tab_bar_layout.removeWidget(old_custom_button)
-            old_custom_button.deleteLater()
-            self.create_custom_tab_button(placeholder_widget, f"Suspended: {title[:10]}...", index)
+    def probe_dirty_forms(self, web_view, callback=None):
+        """
+        Asynchronously records in tab_dirty_forms whether the page has edited form fields,
+        then calls callback(dirty) if the tab is still open.
+        """
+        def store_result(dirty):
+            if web_view in self.tab_last_active_time: # Still open
+                self.tab_dirty_forms[web_view] = bool(dirty)
+                if callback:
+                    callback(bool(dirty))
+        web_view.page().runJavaScript(DIRTY_FORMS_SCRIPT, store_result)
+
+    def discard_tab(self, web_view):
+        """
+        Discards a background tab's page (see set_tab_lifecycle_state); it reloads when activated.
+        Returns False if the page is already discarded or must stay active.
+        """
+        if not self.set_tab_lifecycle_state(web_view, QWebEnginePage.LifecycleState.Discarded):
+            return False
+        self.tab_dirty_forms.pop(web_view, None) # Discarding resets the page
+        return True
 
-        web_view.setParent(None)
-        web_view.deleteLater()
-        self.tab_last_active_time.pop(web_view, None)
+    def set_tab_lifecycle_state(self, web_view, state):
+        """
+        Moves a tab's page to the given lifecycle state, but never further than the page's
+        recommendedState() (which keeps visible pages, pages playing audio and pages with
+        DevTools attached active). Returns True if the state changed.
+        """
+        page = web_view.page()
+        current = page.lifecycleState()
+        if state == QWebEnginePage.LifecycleState.Active:
+            if current == state:
+                return False
+        else:
+            recommended = page.recommendedState()
+            if recommended.value < state.value:
+                state = recommended
+            if current.value >= state.value:
+                return False
+        page.setLifecycleState(state)
+        return True
 
-        print(f"Tab '{title}' suspended.")
-        self.update_tab_counter()
+    def update_tab_lifecycle_indicator(self, web_view, state):
+        """Shows frozen and discarded tabs with an italic title."""
+        custom_button_container = self.custom_tab_buttons_map.get(web_view)
+        if not custom_button_container:
+            return
+        for item in custom_button_container.children():
+            if isinstance(item, QPushButton):
+                font = item.font()
+                font.setItalic(state != QWebEnginePage.LifecycleState.Active)
+                item.setFont(font)
+                break
+        print(f"Tab '{self.tab_widget.tabText(self.tab_widget.indexOf(web_view))}' is now {state.name}.")
 
     def save_to_pdf(self):
         """Saves the current web page as a PDF."""
@@ -2223,20 +3384,40 @@ def go_to_homepage(self):
         current_web_view = self.get_current_web_view()
         if current_web_view:
             current_web_view.setZoomFactor(factor)
+            self.schedule_session_update(current_web_view)
 
     def show_history(self):
         """Displays a menu with recent history entries."""
         menu = QMenu(self)
-        if not self.history:
+        recent_visits = self.history_store.recent_visits(20)
+        if not recent_visits:
             menu.addAction("No history available.").setEnabled(False)
         else:
-            for entry in reversed(self.history[-20:]):
+            for entry in recent_visits:
                 action_text = f"{entry['timestamp']} - {entry['title'] or entry['url']}"
                 action = QAction(action_text, self)
                 action.triggered.connect(lambda checked, url=entry["url"]: self.add_new_tab(url))
                 menu.addAction(action)
+        menu.addSeparator()
+        search_action = QAction("Search History...", self)
+        search_action.triggered.connect(self.show_history_dialog)
+        menu.addAction(search_action)
+        restore_action = QAction("Restore Last Session", self)
+        restore_action.triggered.connect(self.restore_last_session)
+        menu.addAction(restore_action)
         menu.exec(self.history_btn.mapToGlobal(self.history_btn.rect().bottomLeft()))
 
+    def show_history_dialog(self):
+        """Shows the searchable history dialog."""
+        if not self.history_dialog:
+            self.history_dialog = HistoryDialog(self.history_store, self.add_new_tab, self)
+        else:
+            self.history_dialog.update_results()
+        self.history_dialog.show()
+        self.history_dialog.raise_()
+        self.history_dialog.activateWindow()
+        self.history_dialog.search_edit.setFocus()
+
     def show_downloads_manager(self):
         """Shows the Downloads Manager dialog."""
         self.downloads_dialog.show()
@@ -2317,12 +3498,8 @@ def go_to_homepage(self):
         ext_dialog.exec()
 
     def reapply_extension_scripts(self):
-        """Reapplies content scripts to all active web views (e.g., after extension changes)."""
-        for i in range(self.tab_widget.count()):
-            widget = self.tab_widget.widget(i)
-            if isinstance(widget, QWebEngineView):
-                self.extension_manager.apply_content_scripts(widget.page())
-        QMessageBox.information(self, "Extensions", "Extension scripts reapplied. You may need to refresh tabs.")
+        """Extension scripts live on the profile, so open tabs pick up changes on their next load."""
+        QMessageBox.information(self, "Extensions", "Extension scripts updated. Refresh open tabs to apply the changes.")
 
     def show_devtools(self):
         """Opens DevTools for the current web view."""
@@ -2348,17 +3525,14 @@ def go_to_homepage(self):
         self.data_manager.sync_data_from_cloud()
         # Reload all data after sync
         initial_data = self.data_manager.load_data()
-        self.history = initial_data["history"]
-        self.bookmarks = initial_data["bookmarks"]
+        self.import_json_history(initial_data["history"])
+        self.bookmarks = BookmarkStore(initial_data["bookmarks"])
         self.settings = initial_data["settings"]
         self.site_permissions = initial_data["site_permissions"]
         
-        self.home_page.history = self.history
-        self.home_page.bookmarks = self.bookmarks
-        self.home_page.setup_completer()
-        self.setup_completer()
+        self.load_suggestion_index()
         self.update_bookmarks_list()
-        self.extension_manager.load_extensions()
+        self.extension_manager.load_extensions(reload_states=True)
         self.adblock_interceptor.load_ad_domains()
         
         # Reapply settings that affect live browser state
@@ -2487,12 +3661,17 @@ def go_to_homepage(self):
             self.profile.cookieStore().deleteAllCookies()
             print("Cleared all cookies on exit.")
 
+        self.session_timer.stop()
+        self.lazy_preload_timer.stop()
+        self.flush_session() # Keep the open tabs for "Restore Last Session"
+        self.session_journal.close()
+        self.closed_tabs.clear()
+
+        # Removing tabs changes the current tab; activate_tab must not load each restored tab on the way out
+        self.tab_widget.blockSignals(True)
         for i in range(self.tab_widget.count()):
             widget_to_close = self.tab_widget.widget(i)
-            if isinstance(widget_to_close, QWebEngineView):
-                widget_to_close.setParent(None)
-                widget_to_close.deleteLater()
-            elif widget_to_close in self.suspended_tabs_data:
+            if isinstance(widget_to_close, (QWebEngineView, LazyTab)):
                 widget_to_close.setParent(None)
                 widget_to_close.deleteLater()
 
@@ -2504,7 +3683,7 @@ def go_to_homepage(self):
                 widget.deleteLater()
         self.custom_tab_buttons_map.clear()
         self.tab_last_active_time.clear()
-        self.suspended_tabs_data.clear()
+        self.tab_dirty_forms.clear()
 
         for dev_window in list(self.devtools_windows):
             if dev_window:
@@ -2517,6 +3696,14 @@ def go_to_homepage(self):
             self.downloads_dialog.deleteLater()
             self.downloads_dialog = None
 
+        self.suggestion_executor.shutdown(wait=False, cancel_futures=True)
+        self.remote_suggestion_executor.shutdown(wait=False, cancel_futures=True)
+        for thread in self.bookmark_file_threads:
+            thread.requestInterruption()
+            thread.wait()
+        self.page_text_indexer.close()
+        self.history_store.close()
+        self.data_manager.close() # Flush deferred saves
         event.accept()
 
 
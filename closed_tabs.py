@@ -0,0 +1,96 @@
+"""
+Recently closed tabs for "Reopen Closed Tab".
+Each entry keeps the serialized back/forward history of the tab; once the histories held in memory
+exceed a byte limit, the oldest ones are written to files in a spill directory. Nothing here touches Qt.
+"""
+import itertools
+import os
+
+SPILL_SUFFIX = ".history"
+
+
+class ClosedTabStack:
+    """
+    Bounded LIFO of closed tabs: {"url", "title", "position", "zoom", "history"} dicts.
+    At most max_entries are kept (the oldest are dropped) and at most memory_limit bytes of
+    history stay in memory; the rest lives in spill_dir until the entry is popped.
+    """
+    def __init__(self, spill_dir, max_entries=25, memory_limit=1024 * 1024):
+        self.spill_dir = spill_dir
+        self.max_entries = max_entries
+        self.memory_limit = memory_limit
+        self.entries = [] # Oldest first; spilled entries have "history" None and a "history_file"
+        self.memory_bytes = 0
+        self.file_counter = itertools.count(1)
+        os.makedirs(spill_dir, exist_ok=True)
+        self._remove_spill_files() # Left over from a previous run
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, url, title, position, zoom, history):
+        self.entries.append({"url": url, "title": title, "position": position, "zoom": zoom,
+                             "history": history, "history_file": None})
+        self.memory_bytes += len(history)
+        while len(self.entries) > self.max_entries:
+            self._discard(self.entries.pop(0))
+        self._spill()
+
+    def pop(self):
+        """Removes and returns the most recently closed tab with its history loaded, or None."""
+        while self.entries:
+            entry = self.entries.pop()
+            if entry["history_file"] is None:
+                self.memory_bytes -= len(entry["history"])
+            else:
+                try:
+                    with open(entry["history_file"], "rb") as f:
+                        entry["history"] = f.read()
+                except OSError as e:
+                    print(f"Error reading closed tab history: {e}")
+                    entry["history"] = b""
+                self._discard(entry)
+            del entry["history_file"]
+            return entry
+        return None
+
+    def _spill(self):
+        """Writes the histories of the oldest in-memory entries to disk until under memory_limit."""
+        for entry in self.entries:
+            if self.memory_bytes <= self.memory_limit:
+                break
+            if entry["history_file"] is not None:
+                continue
+            path = os.path.join(self.spill_dir, f"{next(self.file_counter)}{SPILL_SUFFIX}")
+            try:
+                with open(path, "wb") as f:
+                    f.write(entry["history"])
+            except OSError as e:
+                print(f"Error writing closed tab history: {e}")
+                return
+            self.memory_bytes -= len(entry["history"])
+            entry["history"] = None
+            entry["history_file"] = path
+
+    def _discard(self, entry):
+        if entry["history_file"] is None:
+            if entry["history"] is not None:
+                self.memory_bytes -= len(entry["history"])
+            return
+        try:
+            os.remove(entry["history_file"])
+        except OSError:
+            pass
+
+    def _remove_spill_files(self):
+        for item in os.scandir(self.spill_dir):
+            if item.name.endswith(SPILL_SUFFIX):
+                try:
+                    os.remove(item.path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        self.entries = []
+        self.memory_bytes = 0
+        self._remove_spill_files()
@@ -0,0 +1,128 @@
+"""
+Extension package reading: CRX2/CRX3 headers and streaming extraction of the embedded ZIP.
+Nothing here touches Qt, so extraction can run on a worker thread.
+"""
+import json
+import os
+import shutil
+import struct
+import zipfile
+
+CRX_MAGIC = b"Cr24"
+ZIP_MAGIC = b"PK\x03\x04"
+COPY_CHUNK_SIZE = 256 * 1024
+
+
+class ExtensionArchiveError(ValueError):
+    """Raised for packages that cannot be installed (bad header, missing manifest, unsafe paths)."""
+
+
+def zip_offset(f):
+    """
+    Returns the offset of the ZIP archive inside a package file.
+    CRX2: magic, version, public key length, signature length, key, signature, ZIP.
+    CRX3: magic, version, header length, protobuf header, ZIP.
+    Plain ZIP files start at offset 0.
+    """
+    f.seek(0)
+    head = f.read(16)
+    if head.startswith(ZIP_MAGIC):
+        return 0
+    if not head.startswith(CRX_MAGIC) or len(head) < 12:
+        raise ExtensionArchiveError("Not a CRX or ZIP file.")
+    version, = struct.unpack_from("<I", head, 4)
+    if version == 2:
+        if len(head) < 16:
+            raise ExtensionArchiveError("Truncated CRX2 header.")
+        key_length, signature_length = struct.unpack_from("<II", head, 8)
+        offset = 16 + key_length + signature_length
+    elif version == 3:
+        header_length, = struct.unpack_from("<I", head, 8)
+        offset = 12 + header_length
+    else:
+        raise ExtensionArchiveError(f"Unsupported CRX version {version}.")
+    f.seek(offset)
+    if f.read(4) != ZIP_MAGIC:
+        raise ExtensionArchiveError("CRX file does not contain a ZIP archive.")
+    return offset
+
+
+class _OffsetFile:
+    """Read-only view of a file starting at an offset, so zipfile sees the embedded archive as a whole file."""
+    def __init__(self, f, offset):
+        self.f = f
+        self.offset = offset
+        self.f.seek(offset)
+
+    def seek(self, position, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position += self.offset
+        return self.f.seek(position, whence) - self.offset
+
+    def tell(self):
+        return self.f.tell() - self.offset
+
+    def read(self, size=-1):
+        return self.f.read(size)
+
+    def seekable(self):
+        return True
+
+
+def _safe_member_path(dest_dir, name):
+    """Maps an archive member name to a path inside dest_dir, rejecting absolute paths and '..' (zip-slip)."""
+    parts = name.replace("\\", "/").split("/")
+    if name.startswith(("/", "\\")) or ":" in parts[0] or ".." in parts:
+        raise ExtensionArchiveError(f"Unsafe path in extension package: {name}")
+    return os.path.join(dest_dir, *[part for part in parts if part and part != "."])
+
+
+def extract_extension(package_path, dest_dir, progress=None, is_cancelled=None):
+    """
+    Streams the files of a CRX or ZIP package into dest_dir (which must not exist yet).
+    manifest.json is read and validated before anything is written. progress(done, total)
+    is called with uncompressed byte counts; is_cancelled() is polled between chunks.
+    Returns the parsed manifest. On any error dest_dir is removed again.
+    """
+    with open(package_path, "rb") as raw:
+        try:
+            archive = zipfile.ZipFile(_OffsetFile(raw, zip_offset(raw)))
+        except zipfile.BadZipFile as e:
+            raise ExtensionArchiveError(f"Corrupt extension package: {e}")
+        with archive:
+            try:
+                manifest = json.loads(archive.read("manifest.json").decode("utf-8-sig"))
+            except KeyError:
+                raise ExtensionArchiveError("Extension package does not contain manifest.json.")
+            except ValueError as e:
+                raise ExtensionArchiveError(f"Invalid manifest.json: {e}")
+            if not isinstance(manifest, dict):
+                raise ExtensionArchiveError("Invalid manifest.json: expected an object.")
+
+            members = archive.infolist()
+            targets = [(info, _safe_member_path(dest_dir, info.filename)) for info in members]
+            total = sum(info.file_size for info in members) or 1
+            done = 0
+
+            os.makedirs(dest_dir)
+            try:
+                for info, target in targets:
+                    if info.is_dir():
+                        os.makedirs(target, exist_ok=True)
+                        continue
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with archive.open(info) as source, open(target, "wb") as out:
+                        while True:
+                            if is_cancelled is not None and is_cancelled():
+                                raise ExtensionArchiveError("Installation cancelled.")
+                            chunk = source.read(COPY_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+                            done += len(chunk)
+                            if progress is not None:
+                                progress(done, total)
+            except BaseException:
+                shutil.rmtree(dest_dir, ignore_errors=True)
+                raise
+    return manifest
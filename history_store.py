@@ -0,0 +1,197 @@
+"""
+Browsing history kept in SQLite (WAL mode).
+Each visit is one row insert, visit counts are aggregated per URL and there is no size cap.
+Titles, URLs and optionally extracted page text are full-text indexed with FTS5 when available.
+"""
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S" # Format of the legacy JSON history entries
+MAX_PAGE_TEXT = 64 * 1024 # Characters of page text kept per URL
+_QUERY_WORD = re.compile(r"\w+")
+
+
+class HistoryStore:
+    """
+    History database with two tables:
+    urls (one row per URL, with title, visit_count and last_visit) and
+    visits (one row per visit, referencing urls).
+    Visit times are Unix timestamps in whole seconds.
+    history_fts (FTS5, rowid = urls.id) holds title, url and page text for search().
+    A connection must only be used from the thread that opened it; open one store per thread.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=5)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self._create_schema()
+        self.fts_enabled = self._create_fts()
+
+    def _create_schema(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with self.connection:
+            self.connection.executescript(f"""
+                CREATE TABLE IF NOT EXISTS urls (
+                    id INTEGER PRIMARY KEY,
+                    url TEXT NOT NULL UNIQUE,
+                    title TEXT NOT NULL DEFAULT '',
+                    visit_count INTEGER NOT NULL DEFAULT 0,
+                    last_visit INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS visits (
+                    id INTEGER PRIMARY KEY,
+                    url_id INTEGER NOT NULL REFERENCES urls(id) ON DELETE CASCADE,
+                    visit_time INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS visits_url_time ON visits(url_id, visit_time);
+                CREATE INDEX IF NOT EXISTS visits_time ON visits(visit_time);
+                CREATE INDEX IF NOT EXISTS urls_last_visit ON urls(last_visit);
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def _create_fts(self):
+        """Creates and fills the full-text table if needed. Returns False if SQLite lacks FTS5."""
+        exists = self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            with self.connection:
+                self.connection.execute("CREATE VIRTUAL TABLE history_fts USING fts5(title, url, content)")
+                self.connection.execute("INSERT INTO history_fts (rowid, title, url, content) SELECT id, title, url, '' FROM urls")
+        except sqlite3.OperationalError as e:
+            print(f"History full-text search unavailable: {e}")
+            return False
+        return True
+
+    def close(self):
+        self.connection.close()
+
+    def add_visit(self, url, title="", visit_time=None):
+        """Records one visit. Returns the URL's visit count after the insert (1 for a new URL)."""
+        visit_time = int(time.time() if visit_time is None else visit_time)
+        with self.connection:
+            url_id = self._upsert_url(url, title, visit_time)
+            self.connection.execute("INSERT INTO visits (url_id, visit_time) VALUES (?, ?)", (url_id, visit_time))
+            self.connection.execute("UPDATE urls SET visit_count = visit_count + 1 WHERE id = ?", (url_id,))
+            return self.connection.execute("SELECT visit_count FROM urls WHERE id = ?", (url_id,)).fetchone()[0]
+
+    def _upsert_url(self, url, title, visit_time):
+        row = self.connection.execute("SELECT id, title FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            url_id = self.connection.execute("INSERT INTO urls (url, title, last_visit) VALUES (?, ?, ?)",
+                                             (url, title or "", visit_time)).lastrowid
+            self._index_text(url_id, url, title or "", "")
+            return url_id
+        url_id, old_title = row
+        title = title or old_title
+        self.connection.execute("UPDATE urls SET title = ?, last_visit = MAX(last_visit, ?) WHERE id = ?",
+                                (title, visit_time, url_id))
+        if title != old_title:
+            self._index_text(url_id, url, title)
+        return url_id
+
+    def _index_text(self, url_id, url, title, content=None):
+        """Replaces the full-text row of a URL; content None keeps the stored page text."""
+        if not self.fts_enabled:
+            return
+        if content is None:
+            row = self.connection.execute("SELECT content FROM history_fts WHERE rowid = ?", (url_id,)).fetchone()
+            content = row[0] if row else ""
+        self.connection.execute("DELETE FROM history_fts WHERE rowid = ?", (url_id,))
+        self.connection.execute("INSERT INTO history_fts (rowid, title, url, content) VALUES (?, ?, ?, ?)",
+                                (url_id, title, url, content))
+
+    def set_page_text(self, url, text):
+        """Stores extracted page text for an already visited URL. Returns False if the URL is unknown."""
+        if not self.fts_enabled:
+            return False
+        with self.connection:
+            row = self.connection.execute("SELECT id, title FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return False
+            self._index_text(row[0], url, row[1], " ".join(text[:MAX_PAGE_TEXT].split()))
+        return True
+
+    def search(self, query, limit=50):
+        """
+        Full-text search over titles, URLs and page text, best match first (bm25, titles weighted highest).
+        Every query word must match as a word prefix. Returns {url, title, timestamp, snippet} dicts.
+        """
+        words = _QUERY_WORD.findall(query)
+        if not words:
+            return []
+        if self.fts_enabled:
+            match = " ".join(f'"{word}"*' for word in words)
+            rows = self.connection.execute("""
+                SELECT urls.url, urls.title, urls.last_visit, snippet(history_fts, 2, '[', ']', '...', 12)
+                FROM history_fts JOIN urls ON urls.id = history_fts.rowid
+                WHERE history_fts MATCH ?
+                ORDER BY bm25(history_fts, 10.0, 4.0, 1.0) LIMIT ?
+            """, (match, limit))
+        else:
+            conditions = " AND ".join("(title LIKE ? OR url LIKE ?)" for _ in words)
+            params = [value for word in words for value in (f"%{word}%", f"%{word}%")]
+            rows = self.connection.execute(f"""
+                SELECT url, title, last_visit, '' FROM urls WHERE {conditions}
+                ORDER BY visit_count DESC, last_visit DESC LIMIT ?
+            """, params + [limit])
+        return [{"url": url, "title": title, "snippet": snippet,
+                 "timestamp": datetime.fromtimestamp(last_visit).strftime(TIMESTAMP_FORMAT)}
+                for url, title, last_visit, snippet in rows]
+
+    def import_entries(self, entries):
+        """
+        Merges legacy/synced JSON entries ({url, title, timestamp}) in one transaction.
+        Visits already present (same URL and second) are skipped, so importing is idempotent.
+        """
+        imported = 0
+        with self.connection:
+            for entry in entries:
+                url = entry.get("url")
+                if not url:
+                    continue
+                try:
+                    visit_time = int(datetime.strptime(entry.get("timestamp", ""), TIMESTAMP_FORMAT).timestamp())
+                except ValueError:
+                    continue
+                url_id = self._upsert_url(url, entry.get("title", ""), visit_time)
+                if self.connection.execute("""
+                    INSERT INTO visits (url_id, visit_time) SELECT ?, ?
+                    WHERE NOT EXISTS (SELECT 1 FROM visits WHERE url_id = ? AND visit_time = ?)
+                """, (url_id, visit_time, url_id, visit_time)).rowcount:
+                    self.connection.execute("UPDATE urls SET visit_count = visit_count + 1 WHERE id = ?", (url_id,))
+                    imported += 1
+        return imported
+
+    def recent_visits(self, limit=20):
+        """Returns the most recent visits, newest first, as {url, title, timestamp} dicts."""
+        rows = self.connection.execute("""
+            SELECT urls.url, urls.title, visits.visit_time FROM visits
+            JOIN urls ON urls.id = visits.url_id
+            ORDER BY visits.visit_time DESC, visits.id DESC LIMIT ?
+        """, (limit,))
+        return [{"url": url, "title": title, "timestamp": datetime.fromtimestamp(visit_time).strftime(TIMESTAMP_FORMAT)}
+                for url, title, visit_time in rows]
+
+    def top_urls(self, limit=None):
+        """Returns {url, title, visit_count, last_visit} dicts, most visited first."""
+        rows = self.connection.execute("""
+            SELECT url, title, visit_count, last_visit FROM urls
+            ORDER BY visit_count DESC, last_visit DESC LIMIT ?
+        """, (-1 if limit is None else limit,))
+        return [{"url": url, "title": title, "visit_count": visit_count, "last_visit": last_visit}
+                for url, title, visit_count, last_visit in rows]
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM visits")
+            self.connection.execute("DELETE FROM urls")
+            if self.fts_enabled:
+                self.connection.execute("DELETE FROM history_fts")
@@ -0,0 +1,55 @@
+"""
+Chrome extension match patterns (https://developer.chrome.com/docs/extensions/develop/concepts/match-patterns).
+Used to validate content script patterns before they are handed to QtWebEngine as @match headers,
+which then does the per-URL matching itself.
+"""
+ALL_URLS = "<all_urls>"
+VALID_SCHEMES = ("http", "https", "file", "ftp", "ws", "wss", "urn")
+WILDCARD_SCHEMES = ("http", "https") # What "*://" expands to
+
+
+class MatchPattern:
+    """
+    One parsed match pattern of the form <scheme>://<host><path>.
+    Raises ValueError for patterns Chrome would reject.
+    """
+    __slots__ = ("pattern", "schemes", "host", "match_subdomains", "path")
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.match_subdomains = False
+        if pattern == ALL_URLS:
+            self.schemes = VALID_SCHEMES
+            self.host = "*"
+            self.path = "/*"
+            return
+
+        scheme, sep, rest = pattern.partition("://")
+        if not sep:
+            raise ValueError(f"Missing scheme separator in match pattern: {pattern}")
+        scheme = scheme.lower()
+        if scheme == "*":
+            self.schemes = WILDCARD_SCHEMES
+        elif scheme in VALID_SCHEMES:
+            self.schemes = (scheme,)
+        else:
+            raise ValueError(f"Invalid scheme in match pattern: {pattern}")
+
+        host, slash, path = rest.partition("/")
+        if not slash:
+            raise ValueError(f"Missing path in match pattern: {pattern}")
+        host = host.lower()
+        if ":" in host and not host.endswith("]"):
+            host = host.rsplit(":", 1)[0] # Ports are accepted but not used for matching
+        if scheme != "file" and not host:
+            raise ValueError(f"Missing host in match pattern: {pattern}")
+        if host != "*" and host.startswith("*."):
+            self.match_subdomains = True
+            host = host[2:]
+        if host != "*" and "*" in host:
+            raise ValueError(f"Wildcard must be the first host label in match pattern: {pattern}")
+        self.host = host
+        self.path = "/" + path
+
+    def __repr__(self):
+        return f"MatchPattern({self.pattern!r})"
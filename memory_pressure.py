@@ -0,0 +1,56 @@
+"""
+Memory accounting for tab discarding, read from Linux /proc.
+On other platforms the readers return None and callers should skip the check.
+"""
+import os
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_process_rss(pid):
+    """Resident set size of a process in bytes, or None if it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_system_memory():
+    """(MemTotal, MemAvailable) in bytes from /proc/meminfo, or None if unavailable."""
+    values = {}
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("MemTotal", "MemAvailable"):
+                    values[name] = int(rest.split()[0]) * 1024
+                    if len(values) == 2:
+                        break
+    except (OSError, ValueError, IndexError):
+        return None
+    if len(values) != 2:
+        return None
+    return values["MemTotal"], values["MemAvailable"]
+
+
+def bytes_over_budget(renderer_bytes, budget_bytes, available_bytes, min_available_bytes):
+    """How much memory needs to be freed to get renderers under budget and system free memory above the minimum."""
+    return max(renderer_bytes - budget_bytes, min_available_bytes - available_bytes, 0)
+
+
+def select_tabs_to_discard(candidates, process_rss, process_tab_counts, bytes_to_free):
+    """
+    Picks tabs to discard, least recently used first, until the estimated freed memory reaches bytes_to_free.
+    candidates: (tab, last_active, pid) for tabs that may be discarded.
+    process_rss: {pid: bytes}; process_tab_counts: {pid: number of live tabs in that renderer}.
+    A renderer shared by several tabs is credited to them in equal shares.
+    """
+    selected = []
+    freed = 0
+    for tab, last_active, pid in sorted(candidates, key=lambda candidate: candidate[1]):
+        if freed >= bytes_to_free:
+            break
+        selected.append(tab)
+        freed += process_rss.get(pid, 0) // max(process_tab_counts.get(pid, 1), 1)
+    return selected
@@ -0,0 +1,101 @@
+"""
+Public Suffix List lookups, used to decide whether two hosts belong to the same site.
+The list is bundled as public_suffix_list.dat so the check works offline.
+"""
+import os
+from functools import lru_cache
+
+PUBLIC_SUFFIX_LIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "public_suffix_list.dat")
+
+
+class PublicSuffixList:
+    """
+    Compiled Public Suffix List.
+    Rules are kept in three hash sets (normal, wildcard parents and exceptions),
+    so finding the public suffix of a host costs a few set probes per label.
+    """
+    def __init__(self, lines=()):
+        self.rules = set()
+        self.wildcards = set() # "*.ck" is stored as "ck"
+        self.exceptions = set() # "!www.ck" is stored as "www.ck"
+        for line in lines:
+            rule = line.strip().split(" ", 1)[0].lower()
+            if not rule or rule.startswith("//"):
+                continue
+            for form in self._forms(rule):
+                if form.startswith("!"):
+                    self.exceptions.add(form[1:])
+                elif form.startswith("*."):
+                    self.wildcards.add(form[2:])
+                else:
+                    self.rules.add(form)
+
+    @staticmethod
+    def _forms(rule):
+        """Yields a rule as written and, for internationalized rules, in its ASCII (punycode) form."""
+        yield rule
+        if not rule.isascii():
+            prefix = rule[0] if rule[0] in "!*" else ""
+            body = rule[2:] if rule.startswith("*.") else rule.lstrip("!")
+            try:
+                yield ("*." if rule.startswith("*.") else prefix) + body.encode("idna").decode("ascii")
+            except UnicodeError:
+                pass
+
+    @classmethod
+    def from_file(cls, path=PUBLIC_SUFFIX_LIST_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f)
+
+    def public_suffix(self, host):
+        """Returns the public suffix of host. Unlisted TLDs count as public suffixes."""
+        labels = host.split(".")
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:])
+            if suffix in self.exceptions:
+                return ".".join(labels[i + 1:])
+            if suffix in self.rules:
+                return suffix
+            if i + 1 < len(labels) and ".".join(labels[i + 1:]) in self.wildcards:
+                return suffix
+        return labels[-1]
+
+    def registrable_domain(self, host):
+        """
+        Returns the registrable domain (eTLD+1) of host, e.g. "b.co.uk" for "a.b.co.uk".
+        IP addresses and hosts that are themselves public suffixes are returned unchanged.
+        """
+        host = host.lower().strip(".")
+        if not host or ":" in host or host.replace(".", "").isdigit():
+            return host
+        suffix = self.public_suffix(host)
+        if len(suffix) >= len(host):
+            return host
+        label_start = host.rfind(".", 0, len(host) - len(suffix) - 1) + 1
+        return host[label_start:]
+
+
+_default_list = None
+
+
+def default_list():
+    """Returns the bundled list, compiling it on first use."""
+    global _default_list
+    if _default_list is None:
+        try:
+            _default_list = PublicSuffixList.from_file()
+        except OSError as e:
+            print(f"Could not load public suffix list from {PUBLIC_SUFFIX_LIST_PATH}: {e}")
+            _default_list = PublicSuffixList()
+    return _default_list
+
+
+@lru_cache(maxsize=8192)
+def registrable_domain(host):
+    """Memoized registrable_domain() lookup against the bundled list."""
+    return default_list().registrable_domain(host)
+
+
+def is_same_site(first_host, second_host):
+    """Returns True if both hosts share a registrable domain."""
+    return first_host == second_host or registrable_domain(first_host) == registrable_domain(second_host)
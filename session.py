@@ -0,0 +1,123 @@
+"""
+Append-only session journal.
+Every tab change appends one JSON line; replaying the file gives the open tabs, so a crash loses at
+most a partially written last line. The journal is rewritten as a single snapshot once it has
+grown well past the number of open tabs. Nothing here touches Qt.
+"""
+import json
+import os
+
+COMPACT_MIN_RECORDS = 200
+
+
+class SessionJournal:
+    """
+    Journal of the current session at path.
+    Tab state is an opaque JSON-serializable dict per tab id (url, title, history, zoom...).
+    Records: {"op": "tab", "id", "state"}, {"op": "close", "id"}, {"op": "order", "ids"},
+    {"op": "active", "id"} and {"op": "snapshot", "tabs", "order", "active"}.
+    """
+    def __init__(self, path, previous_path=None):
+        """Starts an empty journal at path; an existing journal is first moved to previous_path if given."""
+        self.path = path
+        if previous_path and os.path.exists(path):
+            os.replace(path, previous_path)
+        self.tabs = {} # {tab id: state}
+        self.order = []
+        self.active = None
+        self.records = 0 # Records appended since the last snapshot
+        self.file = None
+        self.compact()
+
+    @staticmethod
+    def load(path):
+        """
+        Replays a journal file. Returns (tabs in order as (id, state) pairs, active id).
+        A torn or corrupt line ends the replay; everything before it is kept.
+        """
+        tabs = {}
+        order = []
+        active = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        op = record["op"]
+                        if op == "snapshot":
+                            tabs = {tab_id: state for tab_id, state in record["tabs"]}
+                            order = list(record["order"])
+                            active = record["active"]
+                        elif op == "tab":
+                            if record["id"] not in tabs:
+                                order.append(record["id"])
+                            tabs[record["id"]] = record["state"]
+                        elif op == "close":
+                            tabs.pop(record["id"], None)
+                        elif op == "order":
+                            order = list(record["ids"])
+                        elif op == "active":
+                            active = record["id"]
+                    except (ValueError, KeyError, TypeError):
+                        break
+        except OSError:
+            return [], None
+        ordered = [tab_id for tab_id in order if tab_id in tabs]
+        ordered += [tab_id for tab_id in tabs if tab_id not in ordered]
+        return [(tab_id, tabs[tab_id]) for tab_id in ordered], active
+
+    def update_tab(self, tab_id, state):
+        if self.tabs.get(tab_id) == state:
+            return
+        if tab_id not in self.tabs:
+            self.order.append(tab_id)
+        self.tabs[tab_id] = state
+        self._append({"op": "tab", "id": tab_id, "state": state})
+
+    def remove_tab(self, tab_id):
+        if self.tabs.pop(tab_id, None) is None:
+            return
+        if tab_id in self.order:
+            self.order.remove(tab_id)
+        self._append({"op": "close", "id": tab_id})
+
+    def set_order(self, tab_ids):
+        tab_ids = [tab_id for tab_id in tab_ids if tab_id in self.tabs]
+        if tab_ids != self.order:
+            self.order = tab_ids
+            self._append({"op": "order", "ids": tab_ids})
+
+    def set_active(self, tab_id):
+        if tab_id != self.active:
+            self.active = tab_id
+            self._append({"op": "active", "id": tab_id})
+
+    def _append(self, record):
+        if self.file is None: # Closed
+            return
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush() # Survives a crash of the browser process; the OS writes it out
+        self.records += 1
+        if self.records >= max(COMPACT_MIN_RECORDS, 4 * len(self.tabs)):
+            self.compact()
+
+    def compact(self):
+        """Atomically replaces the journal with a single snapshot record of the current state."""
+        if self.file:
+            self.file.close()
+        snapshot = {"op": "snapshot", "tabs": [[tab_id, state] for tab_id, state in self.tabs.items()],
+                    "order": self.order, "active": self.active}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.records = 0
+
+    def close(self):
+        if self.file:
+            self.compact()
+            self.file.close()
+            self.file = None
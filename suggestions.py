@@ -0,0 +1,420 @@
+"""
+Address bar suggestions over history and bookmarks.
+Entries are indexed by the words of their host, path and title, and ranked by frecency:
+visit weight decayed by age, with a half-life of HALF_LIFE_DAYS.
+"""
+import bisect
+import heapq
+import itertools
+import math
+import json
+import re
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+HALF_LIFE_DAYS = 30
+BOOKMARK_WEIGHT = 5 # A bookmark counts as this many extra visits
+SELECTIVE_WORD_LENGTH = 2 # Shorter query words are checked per entry instead of via the index
+MAX_CANDIDATES = 500 # Above this many candidates, walking entries in rank order is cheaper
+MAX_SCANNED = 1000 # Bound on that walk, so queries made only of very common prefixes stay fast
+IGNORED_TOKENS = frozenset(["", "http", "https", "www"])
+
+_HALF_LIFE_SECONDS = HALF_LIFE_DAYS * 86400
+_TOKEN_SPLIT = re.compile(r"[\W_]+")
+
+
+def tokenize(text):
+    """Lower-cased words of a URL or title, without scheme and 'www' noise."""
+    return [token for token in _TOKEN_SPLIT.split(text.lower()) if token not in IGNORED_TOKENS]
+
+
+class Suggestion:
+    """One URL known from history and/or bookmarks."""
+    __slots__ = ("id", "url", "title", "visit_count", "last_visit", "bookmarked", "tokens", "text", "rank")
+
+    def __init__(self, entry_id, url):
+        self.id = entry_id
+        self.url = url
+        self.title = ""
+        self.visit_count = 0
+        self.last_visit = 0
+        self.bookmarked = False
+        self.tokens = ()
+        self.text = "" # " token token ...", so a word prefix check is one substring search
+        self.rank = None
+
+    def _weight(self):
+        return self.visit_count + (BOOKMARK_WEIGHT if self.bookmarked else 0)
+
+    def _rank(self):
+        # log2(weight * 0.5 ** ((now - last_visit) / half_life)) without the "now" term, which is the
+        # same for every entry. The ranking therefore never has to be recomputed as time passes.
+        return math.log2(max(self._weight(), 1)) + self.last_visit / _HALF_LIFE_SECONDS
+
+    def matches(self, needles):
+        """needles are query words prefixed with a space (see SuggestionIndex.suggest)."""
+        for needle in needles:
+            if needle not in self.text:
+                return False
+        return True
+
+
+class SuggestionIndex:
+    """
+    Word-prefix index over suggestions.
+    postings maps each word to the ids of entries containing it, sorted_tokens allows
+    prefix ranges via bisect, and ranked keeps (-rank, id) pairs sorted so the best entries
+    can be walked first. All updates are incremental; rebuild() replaces everything off the GUI thread.
+    """
+    def __init__(self):
+        self.lock = threading.RLock() # Updates come from the GUI thread, queries from suggestion workers
+        self.generation = 0 # Bumped by clear() and rebuild(), so an older rebuild in progress is dropped
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.updates = None # [(method name, args)] made while a rebuild is in progress
+            self.entries = {} # {url: Suggestion}
+            self.by_id = {} # {id: Suggestion}
+            self.postings = {} # {token: set(ids)}
+            self.sorted_tokens = []
+            self.ranked = [] # [(-rank, id)], ascending, i.e. best first
+            self.next_id = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rebuild(self, history_rows, bookmarks):
+        """
+        Replaces the contents with history_rows (as load_history) and bookmarks (as add_bookmarks).
+        The new index is built without holding the lock, so this can run on a worker thread while
+        queries and updates continue; updates made meanwhile are replayed before it is swapped in.
+        Returns False if a newer rebuild or clear() superseded this one.
+        """
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.updates = updates = []
+        index = SuggestionIndex()
+        index.load_history(history_rows)
+        index.add_bookmarks(bookmarks)
+        with self.lock:
+            if generation != self.generation:
+                return False
+            for name, args in updates:
+                getattr(index, name)(*args)
+            self.updates = None
+            self.entries, self.by_id, self.postings = index.entries, index.by_id, index.postings
+            self.sorted_tokens, self.ranked, self.next_id = index.sorted_tokens, index.ranked, index.next_id
+        return True
+
+    def _log_update(self, name, *args):
+        if self.updates is not None:
+            self.updates.append((name, args))
+
+    def _entry(self, url):
+        entry = self.entries.get(url)
+        if entry is None:
+            entry = Suggestion(self.next_id, url)
+            self.next_id += 1
+            self.entries[url] = entry
+            self.by_id[entry.id] = entry
+        return entry
+
+    def _set_title(self, entry, title, bulk=False):
+        """Re-tokenizes an entry. In bulk mode sorted_tokens is left for the caller to rebuild."""
+        entry.title = title or entry.title
+        tokens = tuple(dict.fromkeys(tokenize(f"{entry.url} {entry.title}")))
+        if tokens == entry.tokens:
+            return
+        for token in entry.tokens:
+            if token not in tokens:
+                ids = self.postings[token]
+                ids.discard(entry.id)
+                if not ids:
+                    del self.postings[token]
+                    if not bulk:
+                        del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                self.postings[token] = ids = set()
+                if not bulk:
+                    bisect.insort(self.sorted_tokens, token)
+            ids.add(entry.id)
+        entry.tokens = tokens
+        entry.text = " " + " ".join(tokens)
+
+    def _update_rank(self, entry):
+        if entry.rank is not None:
+            key = (-entry.rank, entry.id)
+            del self.ranked[bisect.bisect_left(self.ranked, key)]
+        entry.rank = entry._rank()
+        bisect.insort(self.ranked, (-entry.rank, entry.id))
+
+    def load_history(self, rows):
+        """
+        Bulk version of add_history for {url, title, visit_count, last_visit} rows (HistoryStore.top_urls).
+        The sorted structures are rebuilt once at the end instead of per row.
+        """
+        rows = list(rows)
+        with self.lock:
+            self._log_update("load_history", rows)
+            for row in rows:
+                entry = self._entry(row["url"])
+                entry.visit_count = row["visit_count"]
+                entry.last_visit = max(entry.last_visit, row["last_visit"])
+                self._set_title(entry, row["title"], bulk=True)
+            self.sorted_tokens = sorted(self.postings)
+            for entry in self.by_id.values():
+                entry.rank = entry._rank()
+            self.ranked = sorted((-entry.rank, entry.id) for entry in self.by_id.values())
+
+    def add_history(self, url, title="", visit_count=1, last_visit=0):
+        """Adds or replaces the aggregated history of a URL (e.g. a row of the history database)."""
+        with self.lock:
+            self._log_update("add_history", url, title, visit_count, last_visit)
+            entry = self._entry(url)
+            entry.visit_count = visit_count
+            entry.last_visit = max(entry.last_visit, last_visit)
+            self._set_title(entry, title)
+            self._update_rank(entry)
+
+    def add_visit(self, url, title="", visit_time=None):
+        """Records one visit: bumps the count and recency of a single entry."""
+        visit_time = time.time() if visit_time is None else visit_time
+        with self.lock:
+            self._log_update("add_visit", url, title, visit_time)
+            entry = self._entry(url)
+            entry.visit_count += 1
+            entry.last_visit = visit_time
+            self._set_title(entry, title)
+            self._update_rank(entry)
+
+    def add_bookmark(self, url, title=""):
+        with self.lock:
+            self._log_update("add_bookmark", url, title)
+            entry = self._entry(url)
+            self._mark_bookmarked(entry)
+            self._set_title(entry, title)
+            self._update_rank(entry)
+
+    def add_bookmarks(self, bookmarks):
+        """
+        Bulk version of add_bookmark for {url, title} dicts (bookmark imports and startup).
+        The sorted structures are rebuilt once at the end instead of per bookmark.
+        """
+        bookmarks = list(bookmarks)
+        with self.lock:
+            self._log_update("add_bookmarks", bookmarks)
+            for bookmark in bookmarks:
+                entry = self._entry(bookmark["url"])
+                self._mark_bookmarked(entry)
+                self._set_title(entry, bookmark.get("title", ""), bulk=True)
+            self.sorted_tokens = sorted(self.postings)
+            for entry in self.by_id.values():
+                entry.rank = entry._rank()
+            self.ranked = sorted((-entry.rank, entry.id) for entry in self.by_id.values())
+
+    @staticmethod
+    def _mark_bookmarked(entry):
+        entry.bookmarked = True
+        if not entry.last_visit:
+            entry.last_visit = time.time() - _HALF_LIFE_SECONDS # Unvisited bookmarks start half decayed
+
+    def _candidates(self, word):
+        """Ids of entries with a word starting with word, or None if there are more than MAX_CANDIDATES."""
+        start = bisect.bisect_left(self.sorted_tokens, word)
+        end = bisect.bisect_left(self.sorted_tokens, word + "\uffff", start)
+        postings = []
+        total = 0
+        for position in range(start, end):
+            ids = self.postings[self.sorted_tokens[position]]
+            total += len(ids)
+            if total > MAX_CANDIDATES:
+                return None
+            postings.append(ids)
+        return set().union(*postings)
+
+    def suggest(self, query, limit=8, kind=None):
+        """
+        Returns up to limit entries whose words start with every query word, best frecency first.
+        kind restricts results to "history" (visited) or "bookmarks" entries.
+        Selective words are resolved through the index. If every word is too common, entries are
+        walked in rank order instead, looking at no more than MAX_SCANNED of them.
+        """
+        words = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not words:
+            return []
+        with self.lock:
+            return self._suggest(words, limit, kind)
+
+    def _suggest(self, words, limit, kind):
+        needles = [" " + word for word in words]
+        if kind == "history":
+            wanted = lambda entry: entry.visit_count > 0
+        elif kind == "bookmarks":
+            wanted = lambda entry: entry.bookmarked
+        else:
+            wanted = lambda entry: True
+
+        candidates = None
+        for word in words:
+            if len(word) < SELECTIVE_WORD_LENGTH:
+                continue
+            ids = self._candidates(word)
+            if ids is None:
+                continue
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        if candidates is not None:
+            matching = (entry for entry in map(self.by_id.__getitem__, candidates) if entry.matches(needles) and wanted(entry))
+            return heapq.nlargest(limit, matching, key=lambda entry: entry.rank)
+
+        results = []
+        by_id = self.by_id
+        for _, entry_id in itertools.islice(self.ranked, MAX_SCANNED):
+            text = by_id[entry_id].text
+            for needle in needles:
+                if needle not in text:
+                    break
+            else:
+                if wanted(by_id[entry_id]):
+                    results.append(by_id[entry_id])
+                if len(results) == limit:
+                    break
+        return results
+
+
+# Address bar keywords, as handled by DoorsBrowser.load_url_from_address_bar: (label, URL template, word separator)
+SEARCH_KEYWORDS = {
+    "wikipedia": ("Wikipedia", "https://en.wikipedia.org/wiki/{}", "_"),
+    "youtube": ("YouTube", "https://www.youtube.com/results?search_query={}", "+"),
+}
+
+
+def keyword_url(text):
+    """Returns the URL for address bar input starting with a search keyword, or None."""
+    for keyword, (_, template, separator) in SEARCH_KEYWORDS.items():
+        if text.lower().startswith(keyword):
+            return template.format(text[len(keyword):].strip().replace(" ", separator))
+    return None
+
+
+SuggestionItem = namedtuple("SuggestionItem", "url title source")
+
+
+class IndexSource:
+    """History or bookmark suggestions from a SuggestionIndex."""
+    def __init__(self, name, suggestion_index, kind):
+        self.name = name
+        self.suggestion_index = suggestion_index
+        self.kind = kind
+
+    def suggest(self, query, limit, context, is_cancelled):
+        return [SuggestionItem(entry.url, entry.title, self.name)
+                for entry in self.suggestion_index.suggest(query, limit, self.kind)]
+
+
+class OpenTabsSource:
+    """Open tabs whose URL or title words match; context["tabs"] is a [(url, title)] snapshot."""
+    name = "tabs"
+
+    def suggest(self, query, limit, context, is_cancelled):
+        needles = [" " + word for word in tokenize(query)]
+        if not needles:
+            return []
+        results = []
+        for url, title in context.get("tabs", ()):
+            text = " " + " ".join(tokenize(f"{url} {title}"))
+            if all(needle in text for needle in needles):
+                results.append(SuggestionItem(url, title, self.name))
+                if len(results) == limit:
+                    break
+        return results
+
+
+class KeywordSource:
+    """Search keyword shortcuts (see SEARCH_KEYWORDS)."""
+    name = "keywords"
+
+    def suggest(self, query, limit, context, is_cancelled):
+        lowered = query.strip().lower()
+        results = []
+        for keyword, (label, template, _) in SEARCH_KEYWORDS.items():
+            if lowered.startswith(keyword):
+                rest = query.strip()[len(keyword):].strip()
+                results.append(SuggestionItem(keyword_url(query.strip()), f"{label}: {rest}" if rest else label, self.name))
+            elif keyword.startswith(lowered):
+                results.append(SuggestionItem(template.format(""), label, self.name))
+        return results[:limit]
+
+
+class RemoteSource:
+    """
+    Search suggestions from an OpenSearch suggestion endpoint (JSON: [query, [suggestion, ...]]).
+    context["suggest_url"] is the endpoint with a {query} placeholder (empty disables the source)
+    and context["search_url"] the search URL prefix suggestions lead to.
+    Give it its own executor (see SuggestionPipeline) so blocking fetches do not delay the local sources.
+    """
+    name = "remote"
+
+    def __init__(self, timeout=2.0, executor=None):
+        self.timeout = timeout
+        self.executor = executor
+
+    def suggest(self, query, limit, context, is_cancelled):
+        endpoint = context.get("suggest_url")
+        if not endpoint or is_cancelled():
+            return None
+        url = endpoint.replace("{query}", urllib.parse.quote(query))
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        if is_cancelled() or not isinstance(data, list) or len(data) < 2:
+            return None
+        search_url = context.get("search_url", "")
+        return [SuggestionItem(search_url + urllib.parse.quote(text), text, self.name)
+                for text in data[1][:limit] if isinstance(text, str)]
+
+
+class SuggestionPipeline:
+    """
+    Runs every source for a query on an executor and reports results per source as they arrive,
+    via on_results(generation, source name, items) called on the worker thread.
+    Each request() starts a new generation; work and results of older generations are dropped.
+    A source with an executor attribute runs there instead of on the shared executor.
+    """
+    def __init__(self, sources, executor, on_results, limit=8):
+        self.sources = sources
+        self.executor = executor
+        self.on_results = on_results
+        self.limit = limit
+        self.generation = 0
+
+    def request(self, query, context):
+        self.generation += 1
+        generation = self.generation
+        for source in self.sources:
+            (getattr(source, "executor", None) or self.executor).submit(self._run, generation, source, query, context)
+        return generation
+
+    def cancel(self):
+        self.generation += 1
+
+    def _run(self, generation, source, query, context):
+        is_cancelled = lambda: generation != self.generation
+        if is_cancelled():
+            return
+        try:
+            results = source.suggest(query, self.limit, context, is_cancelled)
+        except Exception as e:
+            print(f"Suggestion source '{source.name}' failed: {e}")
+            return
+        if results is not None and not is_cancelled():
+            self.on_results(generation, source.name, results)
@@ -0,0 +1,107 @@
+"""
+Write-behind wrapper for DataManager.
+save_* calls return immediately; the latest arguments per store are written on a
+background thread once the debounce window has passed, so repeated saves coalesce.
+"""
+import threading
+import time
+
+
+class WriteBehindDataManager:
+    """
+    Wraps a DataManager. Calls to save_* methods are queued per method name (a newer
+    call replaces the pending one) and executed on a writer thread at most `delay`
+    seconds after the first queued call. Every other attribute is delegated; methods
+    such as load_data or the sync_* calls flush pending writes first so they see
+    the current state on disk.
+    """
+    def __init__(self, data_manager, delay=0.5):
+        self.data_manager = data_manager
+        self.delay = delay
+        self.pending = {} # {method name: (args, kwargs, due time)}
+        self.writing = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="DataManagerWriter", daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.data_manager, name)
+        if not callable(attribute):
+            return attribute
+        if name.startswith("save_"):
+            return lambda *args, **kwargs: self.schedule(name, *args, **kwargs)
+
+        def flushed_call(*args, **kwargs):
+            self.flush()
+            return attribute(*args, **kwargs)
+        return flushed_call
+
+    def schedule(self, name, *args, **kwargs):
+        """
+        Queues a save. Lists and dicts passed in are copied one level deep, so the caller may keep
+        changing them; the records inside (bookmark and history entries) are never changed in place.
+        """
+        args = tuple(_snapshot(arg) for arg in args)
+        kwargs = {key: _snapshot(value) for key, value in kwargs.items()}
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("WriteBehindDataManager is closed")
+            previous = self.pending.get(name)
+            due = previous[2] if previous is not None else time.monotonic() + self.delay
+            self.pending[name] = (args, kwargs, due)
+            self.condition.notify_all()
+
+    def flush(self):
+        """Writes everything that is pending now and waits until the writes are done."""
+        with self.condition:
+            for name, (args, kwargs, _) in self.pending.items():
+                self.pending[name] = (args, kwargs, 0)
+            self.condition.notify_all()
+            while self.pending or self.writing:
+                self.condition.wait()
+
+    def close(self):
+        """Flushes pending writes and stops the writer thread."""
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.pending:
+                        if self.closed:
+                            return
+                        self.condition.wait()
+                        continue
+                    now = time.monotonic()
+                    next_due = min(due for _, _, due in self.pending.values())
+                    if next_due <= now:
+                        break
+                    self.condition.wait(next_due - now)
+                ready = [(name, args, kwargs) for name, (args, kwargs, due) in self.pending.items() if due <= now]
+                for name, _, _ in ready:
+                    del self.pending[name]
+                self.writing = True
+
+            for name, args, kwargs in ready:
+                try:
+                    getattr(self.data_manager, name)(*args, **kwargs)
+                except Exception as e:
+                    print(f"Error in deferred {name}: {e}")
+
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def _snapshot(value):
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value